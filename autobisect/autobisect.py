@@ -62,6 +62,36 @@ def create_parser():
         '--linux', required=True, default="linux", help='Kernel git reprository directory')
     bictrack_parser.add_argument('--retest_skipped', required=False, default=False,
                                  action='store_true', help='Retest commits which were skipped')
+    bictrack_parser.add_argument('--no_resume', required=False, default=False, action='store_true',
+                                 help='Do not resume an interrupted bictracking from its saved bisect state')
+    bictrack_parser.add_argument('--kernel_dir', required=False, default="linux",
+                                 help='Kernel directory which is built and booted for a test')
+    bictrack_parser.add_argument('--syzkaller_changing', required=False, default="syzkaller-changing",
+                                 help='Syzkaller directory which is checked out and built for a test')
+    bictrack_parser.add_argument('--http_port', required=False, default=56741, type=int,
+                                 help='HTTP port of the syzkaller manager (worker i uses port + i)')
+    bictrack_parser.add_argument('--jobs', required=False, default=1, type=int,
+                                 help='Number of reproducers to bictrack in parallel, each in its own worktree')
+    bictrack_parser.add_argument('--multisect', required=False, default=1, type=int,
+                                 help='Number of commits tested concurrently per bisection or tag search step')
+    bictrack_parser.add_argument('--noisy', required=False, default=False, action='store_true',
+                                 help='Use probabilistic bisection for reproducers which do not crash on every run')
+    bictrack_parser.add_argument('--confidence', required=False, default=0.95, type=float,
+                                 help='Probability at which the noisy bisection accepts a culprit')
+    bictrack_parser.add_argument('--syzbot_bisection', required=False, default=False, action='store_true',
+                                 help='Start from the range of the crawled syzbot bisection if a confirmation run agrees')
+    bictrack_parser.add_argument('--szz_prior', required=False, default=False, action='store_true',
+                                 help='Test the SZZ candidate and its parent before bisecting')
+    bictrack_parser.add_argument('--tag_search', required=False, default="linear", choices=["linear", "binary"],
+                                 help='Search for the last good release tag from newest to oldest or by binary search')
+    bictrack_parser.add_argument('--worker_dir', required=False, default="workers",
+                                 help='Directory for worker worktrees, logs and status files')
+    bictrack_parser.add_argument('--replay', required=False, default=False, action='store_true',
+                                 help='Only replay the bisections on the cached traces and print the culprits')
+    bictrack_parser.add_argument('--replay_thresholds', required=False, default="0.5",
+                                 help='Comma separated different crash thresholds to replay with')
+    bictrack_parser.add_argument('--replay_weights', required=False, default="1:1:1",
+                                 help='Comma separated score weights (trace:crash:location) to replay with')
 
     reproduce_parser = subparsers.add_parser(
         'reproduce', help='Only tries to reproduce the bug on the original commit')
@@ -96,6 +126,22 @@ def create_parser():
         '--dry', required=False, default=False, action='store_true', help='Dry run')
     crawl_parser.add_argument('--linux', required=True, default="linux",
                               help='Kernel git reprository directory (we need to check if fixes are available in commit messages)')
+    crawl_parser.add_argument('--syzbot_url', required=False, default="https://syzkaller.appspot.com",
+                              help='Base URL of syzbot (e.g. a local stand-in for testing)')
+    crawl_parser.add_argument('--requests_per_second', required=False, default=5, type=float,
+                              help='Global rate limit of requests to syzbot (0 for no limit)')
+    crawl_parser.add_argument('--concurrency', required=False, default=8, type=int,
+                              help='Number of concurrent requests to syzbot')
+    crawl_parser.add_argument('--retries', required=False, default=5, type=int,
+                              help='Retries of a request which failed with 429, 5xx or a connection error')
+    crawl_parser.add_argument('--http_cache', required=False, default=None,
+                              help='Directory to cache syzbot responses in, they are revalidated with conditional requests')
+    crawl_parser.add_argument('--delta', required=False, default=False, action='store_true',
+                              help='Only fetch bugs which are new or changed compared to the reproducer directory')
+    crawl_parser.add_argument('--checkpoint', required=False, default=None,
+                              help='File of the bugs an interrupted crawl finished (default: <reproducer_dir>.crawl-checkpoint.jsonl)')
+    crawl_parser.add_argument('--blob_store', required=False, default=workspace_folder + "/blobs",
+                              help='Content addressed store which configs and reproducers are downloaded into and linked from')
 
     szz_parser = subparsers.add_parser(
         'szz', help='Run SZZ on a directory with reproducers')
@@ -0,0 +1,301 @@
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from autobisect.bictracker import bictracker
+from autobisect.bictracker.session import BicTrackerSession
+
+# Benchmarks the trace analysis hot path on synthetic traces:
+#
+# 	python3 -m autobisect.bictracker.benchmark --rows 10000,1000000,5000000 --runs 1,8 --output bench.json
+#
+# For every combination of rows per run and crashed runs per commit two commits ("original" and "suspect") are
+# generated in the layout syz-test-single writes (trace_{i}_{j}.csv, crashtrace_{i}.csv, crash_info_{i}.csv). Every stage is timed
+# on its own and then run once more under tracemalloc for the peak memory. Cold stages remove the trace stores and
+# summaries first, warm stages read what the previous run left behind.
+
+linux_prefix = "/synthetic/linux"
+# worktree of a probe next to the kernel directory, see setup_probe_workspaces
+probe_prefix = "/synthetic/probes/probe_0/linux"
+subsystems = ["kernel", "mm", "fs", "net", "drivers/net", "drivers/block", "sound/core", "block", "ipc", "security"]
+crash_titles = ["KASAN: use-after-free Read in {}", "general protection fault in {}", "WARNING in {}",
+                "KASAN: slab-out-of-bounds Write in {}", "INFO: task hung in {}"]
+
+
+class SyntheticCommitIndex:
+    # stands in for the commit index of the kernel repository in select_culprit
+    def __init__(self, changed_files):
+        self.changed_files = changed_files
+
+    def changed_paths(self, commit):
+        return self.changed_files[commit]
+
+    def close(self):
+        pass
+
+
+def symbol_pools(rows, rand):
+    num_files = max(20, rows // 200)
+    num_functions = max(50, rows // 20)
+    files = []
+    for i in range(num_files):
+        files.append(rand.choice(subsystems) + "/file_" + str(i) + rand.choice([".c", ".c", ".c", ".h"]))
+    functions = ["func_" + str(i) for i in range(num_functions)]
+    return files, functions
+
+
+def write_trace(filename, rows, files, functions, rand, linux):
+    with open(filename, "w") as f:
+        for _ in range(rows):
+            file = files[min(int(rand.expovariate(1 / (len(files) / 4))), len(files) - 1)]
+            function = functions[min(int(rand.expovariate(1 / (len(functions) / 4))), len(functions) - 1)]
+            prefix = linux + ("/./" if rand.random() < 0.1 else "/")
+            f.write(prefix + file + "," + function + "," + str(rand.randint(1, 4000)) + "," +
+                    ("true" if rand.random() < 0.2 else "false") + "\n")
+
+
+def write_crash_info(filename, function, rand):
+    title = rand.choice(crash_titles).format(function)
+    with open(filename, "w") as f:
+        f.write(title + "\n")
+        f.write(title.split(" in ")[0] + "\n")
+        f.write("[" + title + ", " + rand.choice(crash_titles).format(function) + "]\n")
+
+
+# rows are spread over up to four trace files per run like the kcov traces of several processes. All runs of the
+# fixture crash with the same stack (crash_seed), so the suspect scores as the original crash. Traces recorded
+# outside of the main kernel directory note it in status.json like test() does.
+def generate_commit(traces_directory, rows, runs, files, functions, seed, crash_seed, linux=linux_prefix):
+    rand = random.Random(seed)
+    os.makedirs(traces_directory, exist_ok=True)
+    parts = min(4, max(1, rows // 10000))
+    for i in range(runs):
+        for j in range(parts):
+            write_trace(os.path.join(traces_directory, bictracker.trace_string.format(i, j)), rows // parts,
+                        files, functions, rand, linux)
+        crash_rand = random.Random(crash_seed)
+        write_trace(os.path.join(traces_directory, bictracker.crashtrace_string.format(i)), 30, files[:50],
+                    functions[:200], crash_rand, linux)
+        write_crash_info(os.path.join(traces_directory, bictracker.crash_info_string.format(i)),
+                         functions[crash_rand.randrange(min(len(functions), 100))], crash_rand)
+    # syz-test-single always does max_num_tests runs, the others did not crash
+    for i in range(runs, bictracker.max_num_tests):
+        open(os.path.join(traces_directory, bictracker.ok_string.format(i)), "w").close()
+    if linux != linux_prefix:
+        with open(os.path.join(traces_directory, "status.json"), "w") as f:
+            json.dump({"retest_state": "done", "verdict": "bad", "linux": linux}, f)
+
+
+def generate_fixture(directory, rows, runs, seed):
+    rand = random.Random(seed)
+    files, functions = symbol_pools(rows, rand)
+    traces_root = os.path.join(directory, bictracker.experiment_name, "traces")
+    generate_commit(os.path.join(traces_root, "original"), rows, runs, files, functions, seed + 1, seed)
+    generate_commit(os.path.join(traces_root, "suspect"), rows, runs, files, functions, seed + 2, seed)
+    # the suspect once more, tested by a probe
+    generate_commit(os.path.join(traces_root, "probe_suspect"), rows, runs, files, functions, seed + 2, seed,
+                    probe_prefix)
+    with open(os.path.join(directory, "status.json"), "w") as f:
+        json.dump({"id": "benchmark", "kernel-source-commit": "original"}, f)
+
+    candidates = ["candidate_" + str(i) for i in range(20)]
+    changed_files = {candidate: rand.sample(files, min(len(files), rand.randint(1, 10))) for candidate in candidates}
+    return SyntheticCommitIndex(changed_files), candidates
+
+
+def clear_derived(directory):
+    traces_root = os.path.join(directory, bictracker.experiment_name, "traces")
+    for commit in os.listdir(traces_root):
+        for file in os.listdir(os.path.join(traces_root, commit)):
+            if file.endswith(".bct") or file == "summary.json":
+                os.remove(os.path.join(traces_root, commit, file))
+
+
+def new_session(directory):
+    args = argparse.Namespace(linux=linux_prefix, cache=True, no_resume=False, force=False)
+    reproducer = {"data": {"id": "benchmark", "kernel-source-commit": "original"}}
+    session = BicTrackerSession(args, directory, reproducer)
+    session.original_crash = "original"
+    return session
+
+
+# Sessions with the results of "original" (and "suspect") already analyzed
+def analyzed_session(directory, commits=("original",)):
+    session = new_session(directory)
+    session.result_cache["original"] = {}
+    for commit in commits:
+        bictracker.analyze_results(session, commit)
+    session.earliest_bad = commits[-1]
+    return session
+
+
+def stages(directory, commit_index, candidates):
+    traces_directory = os.path.join(directory, bictracker.experiment_name, "traces", "suspect")
+    trace_files = sorted(os.path.join(traces_directory, file) for file in os.listdir(traces_directory)
+                         if file.startswith("trace_0_"))
+    store_filename = os.path.join(traces_directory, "trace_0.bct")
+
+    def parse_trace():
+        bictracker.parse_trace(new_session(directory), trace_files, store_filename, linux_prefix)
+
+    def read_results():
+        bictracker.read_results(new_session(directory), traces_directory)
+
+    def analyze_results():
+        analyzed_session(directory, ("original", "suspect"))
+
+    session = {}
+
+    def prepare_analyze_traces():
+        session["session"] = analyzed_session(directory, ("original", "suspect"))
+        session["session"].commit_index = commit_index
+
+    def analyze_traces():
+        bictracker.analyze_traces(session["session"], session["session"].result_cache["suspect"])
+
+    def select_culprit():
+        bictracker.select_culprit(session["session"], candidates)
+
+    # (name, function, setup before every run, cold: remove trace stores and summaries before every run)
+    return [
+        ("parse_trace_cold", parse_trace, None, True),
+        ("parse_trace_warm", parse_trace, None, False),
+        ("read_results_cold", read_results, None, True),
+        ("read_results_warm", read_results, None, False),
+        ("analyze_results_cold", analyze_results, None, True),
+        ("analyze_results_warm", analyze_results, None, False),
+        ("analyze_traces", analyze_traces, prepare_analyze_traces, False),
+        ("select_culprit", select_culprit, prepare_analyze_traces, False),
+    ]
+
+
+# A commit tested by a probe has to score like the same commit tested in the main kernel directory
+def check_probe_prefix(directory):
+    session = analyzed_session(directory)
+    warnings_before = session.warnings
+    scores = [bictracker.analyze_results(session, commit) for commit in ["suspect", "probe_suspect"]]
+    if scores[0] != scores[1] or session.warnings > warnings_before:
+        raise Exception("Probe tested suspect scores " + str(scores[1]) + " instead of " + str(scores[0]) +
+                        " (" + str(session.warnings - warnings_before) + " warnings)")
+    return scores[0]
+
+
+# A resumed session has to continue from the earliest bad commit the interrupted one had found
+def check_resume(directory):
+    session = analyzed_session(directory, ("original", "suspect"))
+    session.state = bictracker.new_bisect_state(session.original_crash)
+    bictracker.save_bisect_state(session)
+    resumed = new_session(directory)
+    resumed.state = bictracker.load_bisect_state(resumed)
+    os.remove(os.path.join(directory, bictracker.experiment_name, bictracker.bisect_state_filename))
+    if resumed.earliest_bad != session.earliest_bad:
+        raise Exception("Resumed earliest bad commit is " + str(resumed.earliest_bad) + " instead of " +
+                        session.earliest_bad)
+    return resumed.earliest_bad
+
+
+def measure(directory, function, setup, cold, repeat):
+    def prepare():
+        if cold:
+            clear_derived(directory)
+        if setup is not None:
+            setup()
+        gc.collect()
+
+    times = []
+    for _ in range(repeat):
+        prepare()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    prepare()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_benchmark(rows, runs, repeat, seed, workdir):
+    if workdir is not None:
+        os.makedirs(workdir, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix="bictracker-bench-", dir=workdir)
+    try:
+        start = time.perf_counter()
+        commit_index, candidates = generate_fixture(directory, rows, runs, seed)
+        result = {
+            "rows": rows,
+            "runs": runs,
+            "generate_seconds": time.perf_counter() - start,
+            "probe_suspect_score": check_probe_prefix(directory),
+            "resumed_earliest_bad": check_resume(directory),
+            "stages": {},
+        }
+        for name, function, setup, cold in stages(directory, commit_index, candidates):
+            result["stages"][name] = measure(directory, function, setup, cold, repeat)
+            logging.info("rows=" + str(rows) + " runs=" + str(runs) + " " + name + ": " +
+                         str(round(result["stages"][name]["min_seconds"], 4)) + "s, peak " +
+                         str(result["stages"][name]["peak_memory_bytes"] // 1024) + " KiB")
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bictracker trace analysis on synthetic traces')
+    parser.add_argument('--rows', default="10000,100000,1000000", help='Comma separated trace rows per run')
+    parser.add_argument('--runs', default="1,8", help='Comma separated crashed runs per commit (1-8)')
+    parser.add_argument('--repeat', default=3, type=int, help='Timed repetitions per stage')
+    parser.add_argument('--seed', default=0, type=int, help='Seed of the synthetic traces')
+    parser.add_argument('--workdir', default=None, help='Directory for the fixtures (default: system temp)')
+    parser.add_argument('--output', default="benchmark_results.json", help='JSON file to write the results to')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+    # the analysis logs every parsed trace, only the benchmark progress is of interest here
+    logging.getLogger().addFilter(lambda record: record.pathname == os.path.abspath(__file__))
+
+    results = {
+        "commit": git_commit(),
+        "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": [],
+    }
+    for rows in [int(rows) for rows in args.rows.split(",")]:
+        for runs in [int(runs) for runs in args.runs.split(",")]:
+            if runs < 1 or runs > bictracker.max_num_tests:
+                raise Exception("runs must be between 1 and " + str(bictracker.max_num_tests))
+            results["benchmarks"].append(run_benchmark(rows, runs, args.repeat, args.seed, args.workdir))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    logging.info("Results written to " + args.output)
+
+
+if __name__ == "__main__":
+    main()
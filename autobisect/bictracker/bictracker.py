@@ -1,18 +1,27 @@
+import json
 import operator
 import re
 import datetime
 import shutil
 import signal
 import sys
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 import itertools
 import git
 import os
 import logging
-import csv
+from autobisect import gitservice
 from autobisect.autobisect import CustomFormatter
 
+from autobisect.bictracker import replay, summarycache, syzbotlog, tracestore
+from autobisect.bictracker.bisection import Bisection, CommitGraph, ProbabilisticBisection
+from autobisect.bictracker.session import BicTrackerSession
+from autobisect.bictracker.workers import run_parallel, setup_probe_workspaces
 from autobisect.bisector.test_single import reproduce_crash
+from autobisect.commitindex import CommitIndex
+from autobisect.szz import szz
 from autobisect.common import load_reproducers, load_status, load_data, write_status, write_status_path
 
 exampleReproducer = {
@@ -51,21 +60,17 @@ GOOD = -2
 # 	- ...
 
 experiment_name = "bictracker"
-earliest_bad = None
-result_cache = {}
 
-stop = False
-
-original_crash = None
-syzbot_crash = None
-
-summary = ""
-warnings = 0
+# Set on Ctrl+C, shared by all sessions of this process
+stop_event = threading.Event()
 
 version = "0.5"
 
 
 def start(args):
+    if args.replay:
+        replay.start(args, "c5f4546593e9911800f0926c1090959b58bc5c93", run_bictracker)
+        return
     logging.info("Starting BIC-Tracker version " + version)
     signal.signal(signal.SIGINT, signal_handler)
     start_time = datetime.datetime.now()
@@ -78,13 +83,15 @@ def start(args):
             datetime.datetime.strptime(x["data"]["syzkaller-crash"]["time"], "%Y/%m/%d %H:%M")),
         reverse=True)
 
-    for reproducer in reproducers:
-        directory = os.path.join(args.reproducer_dir, reproducer["data"]["id"])
-        bic_track(args, directory,
-                  "c5f4546593e9911800f0926c1090959b58bc5c93", reproducer)
-        global stop
-        if stop:
-            break
+    if args.jobs > 1:
+        run_parallel(args, reproducers, bic_track, "c5f4546593e9911800f0926c1090959b58bc5c93")
+    else:
+        for reproducer in reproducers:
+            directory = os.path.join(args.reproducer_dir, reproducer["data"]["id"])
+            bic_track(args, directory,
+                      "c5f4546593e9911800f0926c1090959b58bc5c93", reproducer)
+            if stop_event.is_set():
+                break
     logging.info("BIC-Tracker finished at " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " (Total time: " +
                  str(datetime.datetime.now() - start_time) + ")")
 
@@ -107,18 +114,15 @@ def bic_track(args, reproducer_directory, min_good, reproducer):
     status["reason"] = ""
     write_status(reproducer_directory, experiment_name, status)
 
-    global syzbot_crash
-    global summary
-    summary = ""
     repo = git.Repo(args.linux)
 
-    status = run_bictracker(args, reproducer_directory,
-                            min_good, reproducer, repo)
-    global warnings
-    status["warnings"] = str(warnings)
-    status["version"] = version
-    print("Summary:")
-    print(summary)
+    with BicTrackerSession(args, reproducer_directory, reproducer,
+                           different_crash_threshold=different_crash_tresh_hold) as session:
+        status = run_bictracker(session, min_good, repo)
+        status["warnings"] = str(session.warnings)
+        status["version"] = version
+        print("Summary:")
+        print(session.summary)
 
     status["retest_date"] = datetime.datetime.now().strftime(
         "%Y-%m-%d %H:%M:%S")
@@ -139,80 +143,100 @@ def cleanup(reproducer_directory):
                                        experiment_name, "traces", file, "workdir"))
 
 
-def run_bictracker(args, reproducer_directory, min_good, reproducer, repo):
+def run_bictracker(session, min_good, repo):
+    reproducer = session.reproducer
     try:
         logging.info("Trying to reproduce on original commit: " +
                      reproducer["data"]["kernel-source-commit"])
 
-        global summary
-        global original_crash
-        global result_cache
-        original_crash = reproducer["data"]["kernel-source-commit"]
+        session.original_crash = reproducer["data"]["kernel-source-commit"]
         # TODO: set basic crash info
-        result_cache[original_crash] = {}
+        session.result_cache[session.original_crash] = {}
+        session.state = load_bisect_state(session)
 
-        summary += "> test original commit " + \
+        session.summary += "> test original commit " + \
             reproducer["data"]["kernel-source-commit"] + "\n"
-        test(args, reproducer_directory, reproducer,
-             reproducer["data"]["kernel-source-commit"])
+        test(session, reproducer["data"]["kernel-source-commit"])
         verdict = analyze_results(
-            args, reproducer_directory, reproducer["data"]["kernel-source-commit"])
-        summary += "=> " + verdict_str(verdict) + "\n"
+            session, reproducer["data"]["kernel-source-commit"])
+        record_verdict(session, reproducer["data"]["kernel-source-commit"], verdict)
+        session.summary += "=> " + verdict_str(verdict) + "\n"
 
         if verdict == INVALID or verdict == GOOD:
-            summary += "> Return as szz should be executed instead.\n"
+            session.summary += "> Return as szz should be executed instead.\n"
             return {
                 "retest_state": "delayed",
                 "reason": "Crash could not be reproduced on original commit as verdict was " +
                           "invalid" if verdict == INVALID else "good"
             }
 
-        global earliest_bad
-        global warnings
-        earliest_bad = original_crash
+        # a resumed bictracking continues from the earliest bad commit it had found
+        if session.earliest_bad is None:
+            session.earliest_bad = session.original_crash
+        elif session.earliest_bad not in session.result_cache:
+            analyze_results(session, session.earliest_bad)
 
-        last_good_major = get_last_good_major(
-            args, repo, reproducer_directory, min_good, reproducer)
+        if session.state["last_good_major"] is not None:
+            last_good_major = session.state["last_good_major"]
+            logging.info("Resuming with last good major " + last_good_major)
+            session.summary += "> Resume with last good major " + last_good_major + "\n"
+        else:
+            last_good_major = None
+            if session.args.syzbot_bisection:
+                last_good_major = warm_start_from_syzbot(session)
+            if last_good_major is None:
+                last_good_major = get_last_good_major(session, repo, min_good)
+            session.state["last_good_major"] = last_good_major
+            save_bisect_state(session)
 
         if min_good == last_good_major:
-            summary += "> Return as crash happens on all tested versions.\n"
+            session.summary += "> Return as crash happens on all tested versions.\n"
             return {
                 "retest_state": "delayed",
                 "reason": "Crash happens on all tested versions"
             }
         # Print number of commits between last good and earliest bad
+        commit_index = get_commit_index(session)
         logging.info("Number of commits between last good and earliest bad: " + str(
-            len(list(repo.iter_commits(last_good_major + ".." + earliest_bad)))))
+            commit_index.count(session.earliest_bad, [last_good_major])))
 
         executed_files = []
-        if earliest_bad in result_cache and "traces" in result_cache[earliest_bad] and result_cache[earliest_bad]["traces"] is not None:
-            executed_files = get_executed_files(
-                result_cache[earliest_bad]["traces"])
+        earliest_bad_result = session.result_cache.get(session.earliest_bad)
+        if earliest_bad_result is not None and "traces" in earliest_bad_result and earliest_bad_result["traces"] is not None:
+            executed_files = get_executed_files(earliest_bad_result["traces"])
             # Print number of commits between last good and earliest bad which changed the files executed by the reproducer
             logging.info("Number of commits between last good and earliest bad which changed the files executed by the reproducer: " + str(
-                len(list(repo.iter_commits(last_good_major + ".." + earliest_bad, paths=executed_files)))))
+                commit_index.count(session.earliest_bad, [last_good_major], executed_files)))
         else:
             logging.error(
-                "Traces not available for earliest bad commit " + earliest_bad)
-            warnings += 1
+                "Traces not available for earliest bad commit " + session.earliest_bad)
+            session.warnings += 1
 
-        candidate_list = bisect(
-            args, reproducer_directory, last_good_major, reproducer, executed_files)
+        candidate_list = None
+        if session.args.szz_prior:
+            candidate_list = test_szz_prior(session, last_good_major)
+        if candidate_list is None:
+            candidate_list = bisect(session, last_good_major, executed_files)
 
         if len(candidate_list) == 0:
-            summary += "> Return as too many skips.\n"
+            session.summary += "> Return as too many skips.\n"
             return {
                 "retest_state": "delayed",
                 "reason": "Too many skips"
             }
 
-        summary += "> Candidate list: " + str(candidate_list) + "\n"
-        culprit = select_culprit(args, repo, candidate_list)
+        session.summary += "> Candidate list: " + str(candidate_list) + "\n"
+        if session.earliest_bad not in session.result_cache:
+            # earliest bad was found before the bisection was resumed, its results are needed for the culprit
+            analyze_results(session, session.earliest_bad)
+        culprit = select_culprit(session, candidate_list)
+        session.state["finished"] = True
+        save_bisect_state(session)
 
         logging.info(
             "BIC-Tracker completed! Culprit: " + str(culprit) + " out of candidate list: " + str(candidate_list))
 
-        summary += "> Return culprit " + str(culprit) + "."
+        session.summary += "> Return culprit " + str(culprit) + "."
         return {
             "retest_state": "done",
             "culprit": str(culprit)
@@ -220,8 +244,8 @@ def run_bictracker(args, reproducer_directory, min_good, reproducer, repo):
 
     except Exception as e:
         logging.error("Exception: " + str(e))
-        warnings += 1
-        summary += "> Exception: " + str(e) + "\n"
+        session.warnings += 1
+        session.summary += "> Exception: " + str(e) + "\n"
         traceback.print_exc()
         return {
             "retest_state": "failed",
@@ -229,6 +253,74 @@ def run_bictracker(args, reproducer_directory, min_good, reproducer, repo):
         }
 
 
+bisect_state_filename = "bisect_state.json"
+
+
+def new_bisect_state(original_commit):
+    return {
+        "original_commit": original_commit,
+        "finished": False,
+        # commit -> verdict of every analyzed commit
+        "verdicts": {},
+        # tag -> verdict of the search for the last good major
+        "tags": {},
+        "last_good_major": None,
+        "earliest_bad": None,
+        # [commit, "good" | "bad" | "skip"] in the order they were decided
+        "bisect_steps": [],
+        # [commit, crashes, runs] of the noisy bisection
+        "observations": [],
+        # confirmed commits which narrow the bisection range beyond last_good_major..original commit
+        "bounds": {"bad": None, "good": []},
+        # {"commit": tested SZZ candidate, "culprit": the candidate if it was confirmed}
+        "szz_prior": None,
+    }
+
+
+def load_bisect_state(session):
+    state_path = os.path.join(session.reproducer_directory, experiment_name, bisect_state_filename)
+    if session.replay or session.args.no_resume or session.args.force or not os.path.isfile(state_path):
+        return new_bisect_state(session.original_crash)
+    try:
+        with open(state_path, "r") as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError) as e:
+        logging.warning("Could not read bisect state " + state_path + ": " + str(e))
+        return new_bisect_state(session.original_crash)
+    if state.get("original_commit") != session.original_crash or state.get("finished"):
+        return new_bisect_state(session.original_crash)
+    state.setdefault("observations", [])
+    state.setdefault("bounds", {"bad": None, "good": []})
+    state.setdefault("szz_prior", None)
+    # a confirmed bad bound is the earliest bad commit of states written before it was saved
+    state.setdefault("earliest_bad", state["bounds"]["bad"])
+    session.earliest_bad = state["earliest_bad"]
+    logging.info("Resuming bictracking from " + state_path + " (" + str(len(state["verdicts"])) +
+                 " analyzed commits, " + str(len(state["bisect_steps"])) + " bisection steps)")
+    return state
+
+
+# Written after every step, atomically as Ctrl+C exits immediately
+def save_bisect_state(session):
+    if session.replay:
+        return
+    state_path = os.path.join(session.reproducer_directory, experiment_name, bisect_state_filename)
+    session.state["earliest_bad"] = session.earliest_bad
+    with open(state_path + ".tmp", "w") as state_file:
+        json.dump(session.state, state_file, indent=4)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def record_verdict(session, commit, verdict):
+    session.state["verdicts"][commit] = verdict
+    save_bisect_state(session)
+
+
+def record_bisect_step(session, commit, decision):
+    session.state["bisect_steps"].append([commit, decision])
+    save_bisect_state(session)
+
+
 def verdict_str(verdict):
     if verdict == INVALID:
         return "INVALID"
@@ -238,32 +330,207 @@ def verdict_str(verdict):
         return str(verdict)
 
 
-def get_last_good_major(args, repo, directory, min_good, reproducer):
-    global summary
+def get_last_good_major(session, repo, min_good):
     # get major version of bad commit
     tags_before = get_tags_before(
-        repo, reproducer["data"]["kernel-source-commit"], min_good)
+        repo, session.reproducer["data"]["kernel-source-commit"], min_good)
 
     if len(tags_before) == 0:
-        summary += "> Return as no tags before bad commit.\n"
+        session.summary += "> Return as no tags before bad commit.\n"
         return ["v5.0"]
 
     "> Search last good major\n"
+    if session.args.tag_search == "binary":
+        return search_last_good_major(session, min_good, tags_before)
+    tag_commits = gitservice.get(session.args.linux).rev_parse_many(tags_before)
     for tag in tags_before:
-        commit = repo.git.rev_parse(tag)
-        summary += ">> Test " + tag + "\n"
+        if tag in session.state["tags"]:
+            verdict = session.state["tags"][tag]
+            session.summary += ">> Resume " + tag + " => verdict: " + verdict_str(verdict) + "\n"
+            if verdict == GOOD:
+                return tag
+            continue
+        commit = tag_commits[tag]
+        session.summary += ">> Test " + tag + "\n"
         logging.info("Testing " + tag + " (" + commit + ")")
-        test(args, directory, reproducer, commit)
+        test(session, commit)
         # reproduce_crash(directory, args.baseline_config,
         #                 args.kernel_repository, args.kernel_branch, commit,
         #                 args.syzkaller_repository, args.syzkaller_branch, reproducer["data"]["syzkaller-commit"])
-        verdict = analyze_results(args, directory, commit)
-        summary += "=> verdict: " + verdict_str(verdict) + "\n"
+        verdict = analyze_results(session, commit)
+        session.state["tags"][tag] = verdict
+        record_verdict(session, commit, verdict)
+        session.summary += "=> verdict: " + verdict_str(verdict) + "\n"
         if verdict == GOOD:
             return tag
     return min_good
 
 
+# Binary search for the newest good tag in tags_before (newest first), assuming tags are bad up to some release and
+# good afterwards. With args.multisect > 1 several tags are tested concurrently and the range shrinks to about
+# 1/(k+1) per step. Skipped tags are left out of later steps, if only skipped tags remain between the newest bad and
+# the oldest good tag the good one is returned, like the linear search would.
+def search_last_good_major(session, min_good, tags_before):
+    args = session.args
+    tag_commits = gitservice.get(args.linux).rev_parse_many(tags_before)
+    k = args.multisect
+    # tags_before[good] is the newest good tag found so far, len(tags_before) stands for min_good
+    good = len(tags_before)
+    bad = -1
+    skipped = set()
+
+    def mark(index, verdict):
+        nonlocal good, bad
+        decision = bisect_decision(session, verdict)
+        if decision == "good":
+            good = min(good, index)
+        elif decision == "bad":
+            bad = max(bad, index)
+        else:
+            skipped.add(index)
+
+    for index, tag in enumerate(tags_before):
+        if tag in session.state["tags"]:
+            verdict = session.state["tags"][tag]
+            session.summary += ">> Resume " + tag + " => verdict: " + verdict_str(verdict) + "\n"
+            mark(index, verdict)
+
+    probes = []
+    tests = 0
+    while True:
+        # ends at once if a bad tag is older than a good one (not monotonic), the newest good tag is returned then
+        candidates = [index for index in range(bad + 1, good) if index not in skipped and
+                      tags_before[index] not in session.state["tags"]]
+        if len(candidates) == 0:
+            break
+        indices = sorted(set(candidates[(j + 1) * len(candidates) // (k + 1)]
+                             for j in range(min(k, len(candidates)))))
+        tags = [tags_before[index] for index in indices]
+        commits = [tag_commits[tag] for tag in tags]
+        logging.info("Testing tags " + str(tags) + " between " +
+                     (tags_before[bad] if bad >= 0 else "bad commit") + " and " +
+                     (tags_before[good] if good < len(tags_before) else min_good))
+        if len(commits) > 1 and len(probes) < len(commits) and not session.replay:
+            probes = setup_probe_workspaces(args, k)
+        run_tests(session, commits, probes)
+        tests += len(commits)
+
+        for index, tag, commit in zip(indices, tags, commits):
+            verdict = analyze_results(session, commit)
+            session.state["tags"][tag] = verdict
+            record_verdict(session, commit, verdict)
+            session.summary += ">> Test " + tag + " => verdict: " + verdict_str(verdict) + "\n"
+            mark(index, verdict)
+
+    logging.info("Tag search done after " + str(tests) + " tests.")
+    if good == len(tags_before):
+        return min_good
+    return tags_before[good]
+
+
+# Tests the commits once each, concurrently with args.multisect > 1, and returns their bisect decisions
+def test_and_decide(session, commits):
+    args = session.args
+    if args.multisect > 1 and not session.replay:
+        run_tests(session, commits, setup_probe_workspaces(args, len(commits)))
+    else:
+        for commit in commits:
+            run_tests(session, [commit], [])
+
+    decisions = []
+    for commit in commits:
+        verdict = analyze_results(session, commit)
+        record_verdict(session, commit, verdict)
+        session.summary += ">> Test " + commit + " => " + verdict_str(verdict) + "\n"
+        decisions.append(bisect_decision(session, verdict))
+    return decisions
+
+
+# Narrows the range to syzbot's cause bisection: its first bad commit and its last good commit are tested once each
+# and used as bounds if the verdicts agree. Returns the good commit or None to search the tags instead.
+def warm_start_from_syzbot(session):
+    args = session.args
+    syzbot_bisection = syzbotlog.load(session.reproducer_directory)
+    if syzbot_bisection is None:
+        logging.info("No syzbot bisection log, searching last good major")
+        return None
+    bad, good = syzbot_bisection.first_bad(), syzbot_bisection.last_good()
+    if bad is None or good is None:
+        logging.info("Syzbot bisection log contains no good and bad commit")
+        return None
+
+    git_service = gitservice.get(args.linux)
+    if not git_service.exists(bad) or not git_service.is_ancestor(bad, session.original_crash):
+        logging.info("Syzbot's first bad commit " + bad + " is not an ancestor of the original commit")
+        return None
+
+    session.summary += "> Confirm syzbot bisection (bad " + bad + ", good " + good + ")\n"
+    logging.info("Confirming syzbot bisection, bad " + bad + ", good " + good)
+    decisions = test_and_decide(session, [bad, good])
+    if decisions != ["bad", "good"]:
+        logging.info("Syzbot bisection not confirmed (" + str(decisions) + "), searching last good major")
+        session.summary += "=> not confirmed\n"
+        return None
+
+    session.summary += "=> confirmed\n"
+    session.state["bounds"]["bad"] = bad
+    return good
+
+
+# Tests the SZZ candidate most algorithms agree on and its parent before bisecting. If the candidate is bad and its
+# parent good it is the culprit, otherwise both verdicts narrow the bounds of the bisection. Returns the candidate
+# list or None to bisect.
+def test_szz_prior(session, last_good_major):
+    args = session.args
+    git_service = gitservice.get(args.linux)
+    prior = session.state["szz_prior"]
+    if prior is not None:
+        logging.info("Resuming after SZZ candidate " + prior["commit"])
+        return [prior["culprit"]] if prior["culprit"] is not None else None
+
+    bounds = session.state["bounds"]
+    bad = bounds["bad"] or session.original_crash
+    candidate = None
+    for commit in szz.load_inducing_commits(session.reproducer_directory):
+        if git_service.exists(commit) and git_service.is_ancestor(commit, bad) and \
+                not git_service.is_ancestor(commit, last_good_major):
+            candidate = git_service.rev_parse(commit)
+            break
+        logging.info("SZZ candidate " + commit + " is not in the bisection range")
+    if candidate is None:
+        logging.info("No SZZ candidate in the bisection range, bisecting")
+        return None
+
+    parent = git_service.rev_parse(candidate + "^")
+    session.summary += "> Test SZZ candidate " + candidate + " and its parent\n"
+    decisions = test_and_decide(session, [candidate, parent])
+    candidate_decision, parent_decision = decisions
+
+    culprit = None
+    if candidate_decision == "bad" and parent_decision == "good":
+        culprit = candidate
+        session.earliest_bad = candidate
+    else:
+        if parent_decision == "bad":
+            bounds["bad"] = parent
+        elif candidate_decision == "bad":
+            bounds["bad"] = candidate
+        elif candidate_decision == "good":
+            bounds["good"].append(candidate)
+        elif parent_decision == "good":
+            bounds["good"].append(parent)
+        if bounds["bad"] is not None:
+            session.earliest_bad = bounds["bad"]
+
+    session.state["szz_prior"] = {"commit": candidate, "culprit": culprit}
+    save_bisect_state(session)
+    if culprit is None:
+        logging.info("SZZ candidate " + candidate + " is not the culprit (" + str(decisions) + "), bisecting")
+        return None
+    logging.info("SZZ candidate " + candidate + " is the culprit")
+    return [culprit]
+
+
 tag_re = re.compile(r"^v(\d+)\.(\d+)$")
 
 
@@ -288,18 +555,17 @@ crashtrace_string = "crashtrace_{}.csv"
 crash_info_string = "crash_info_{}.csv"
 
 
-def read_result(args, i, files, traces_directory):
+def read_result(session, i, files, traces_directory, linux):
     if trace_string.format(i, 0) in files:
-        traces = []
-        for j in range(0, max_num_tests):
-            if trace_string.format(i, j) in files:
-                traces += parse_trace(args, os.path.join(
-                    traces_directory, trace_string.format(i, j)))
+        trace_files = [os.path.join(traces_directory, trace_file)
+                       for trace_file in tracestore.trace_files_of_run(files, i, max_num_tests)]
+        traces = parse_trace(session, trace_files, os.path.join(
+            traces_directory, tracestore.trace_store_string.format(i)), linux)
     else:
         traces = None
     if crashtrace_string.format(i) in files:
-        crashtrace = parse_trace(args, os.path.join(
-            traces_directory, crashtrace_string.format(i)))
+        crashtrace = parse_trace(session, [os.path.join(traces_directory, crashtrace_string.format(i))],
+                                 os.path.join(traces_directory, tracestore.crashtrace_store_string.format(i)), linux)
     else:
         crashtrace = None
     if crash_info_string.format(i) in files:
@@ -361,19 +627,34 @@ def ranges_to_str(ranges):
     return ranges_str[:-2]
 
 
-def read_results(args, traces_directory):
-    global summary
-    global warnings
+# Kernel tree the traces of a commit were recorded in. Probes and workers build in their own worktree, so the
+# prefix of the traced files depends on where the commit was tested (results of older runs: session.args.linux)
+def trace_prefix(session, traces_directory):
+    return load_status(traces_directory).get("linux", session.args.linux)
+
+
+def read_results(session, traces_directory):
     files = os.listdir(traces_directory)
+    linux = trace_prefix(session, traces_directory)
 
     missing_traces = []
     missing_crashtraces = []
     missing_crash_info = []
 
-    results = []
-    for i in range(max_num_tests):
-        result = read_result(args, i, files, traces_directory)
-        results.append(result)
+    cached = summarycache.load_summary(traces_directory, files, linux)
+    if cached is not None:
+        logging.info("Using result summary of " + traces_directory)
+        results, parse_warnings = cached
+        if parse_warnings > 0:
+            logging.error(str(parse_warnings) + " warnings while parsing traces of " + traces_directory)
+            session.warnings += parse_warnings
+    else:
+        warnings_before = session.warnings
+        results = [read_result(session, i, files, traces_directory, linux) for i in range(max_num_tests)]
+        summarycache.write_summary(traces_directory, files, linux, results,
+                                   session.warnings - warnings_before)
+
+    for i, result in enumerate(results):
         if "crashed" in result and result["crashed"]:
             if "traces" not in result or result["traces"] is None:
                 missing_traces.append(i)
@@ -395,31 +676,31 @@ def read_results(args, traces_directory):
                 ranges_to_str(to_ranges(missing_crash_info))
 
         logging.error("Missing: " + missing_files_str)
-        summary += "! Missing: " + missing_files_str + "\n"
-        warnings += 1
+        session.summary += "! Missing: " + missing_files_str + "\n"
+        session.warnings += 1
 
     return results
 
 
 # returns either INVALID or the chance that the crash triggered is the same
-def analyze_results(args, directory, commit):
-    global summary
-    global warnings
+def analyze_results(session, commit):
     traces_directory = os.path.join(
-        directory, experiment_name, "traces", commit)
+        session.reproducer_directory, experiment_name, "traces", commit)
 
     results = []
 
     if not os.path.exists(traces_directory):
         logging.error("Traces directory " +
                       traces_directory + " does not exist!")
-        warnings += 1
+        session.warnings += 1
+        session.run_counts[commit] = (0, 0)
         return INVALID
 
-    results = read_results(args, traces_directory)
+    results = read_results(session, traces_directory)
 
     valid = [result for result in results if result["valid"]]
     if len(valid) == 0:
+        session.run_counts[commit] = (0, 0)
         return INVALID
 
     # if not enough valids, more runs can be triggered or INVALID could be returned
@@ -428,15 +709,16 @@ def analyze_results(args, directory, commit):
     max_score = 0
     max_score_result = None
     invalid_scores = []
+    crashed_scores = iter(analyze_all_traces(session, [result for result in results if result["crashed"]]))
     for i, result in enumerate(results):
         if result["crashed"]:
-            score = analyze_traces(result)
+            score = next(crashed_scores)
             if score is None:
                 invalid_scores.append(i)
                 score = 1
             scores.append(score)
 
-            if score > different_crash_tresh_hold and score > max_score:
+            if score > session.different_crash_threshold and score > max_score:
                 max_score = score
                 max_score_result = result
 
@@ -451,44 +733,32 @@ def analyze_results(args, directory, commit):
                     str(invalid_range[1]) + ", "
         invalid_ranges_str = invalid_ranges_str[:-2]
         logging.error("Replaced scores: " + invalid_ranges_str)
-        warnings += 1
-        summary += "! Replaced scores: " + invalid_ranges_str + "\n"
+        session.warnings += 1
+        session.summary += "! Replaced scores: " + invalid_ranges_str + "\n"
+
+    # Runs with a different crash tell nothing about whether the original crash reproduces
+    same_crash_runs = len([score for score in scores if score > session.different_crash_threshold])
+    session.run_counts[commit] = (same_crash_runs, len(valid) - (len(scores) - same_crash_runs))
 
-    global result_cache
     if len(scores) == 0:
-        result_cache[commit] = {}
+        session.result_cache[commit] = {}
         return GOOD
     else:
-        result_cache[commit] = max_score_result
+        session.result_cache[commit] = max_score_result
         return max(scores)
 
 
-def parse_trace(args, filename):
-    global warnings
-    traces = []
-    # parse csv file
-    with open(filename, "r") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[3] != "true" and row[3] != "false":
-                logging.error("Invalid inline value in trace file " + filename)
-                warnings += 1
-                continue
-            file = row[0]
-            # remove prefix
-            if file.startswith(args.linux + "/./"):
-                file = file[len(args.linux + "/./"):]
-            elif file.startswith(args.linux + "/"):
-                file = file[len(args.linux + "/"):]
-            else:
-                logging.error("Filename " + file + " does not start with prefix")
-                warnings += 1
-            traces.append({
-                "file": row[0],
-                "function": row[1],
-                "line": row[2],
-                "inline": row[3] == "true",
-            })
+# The csv files are converted into the binary trace store on first use, later reads only map the store
+def parse_trace(session, filenames, store_filename, linux):
+    traces = tracestore.load_or_convert(filenames, store_filename, linux)
+    if traces.header["invalid_rows"] > 0:
+        logging.error(str(traces.header["invalid_rows"]) + " rows with invalid inline value in trace files " +
+                      str(filenames))
+        session.warnings += traces.header["invalid_rows"]
+    if traces.header["unprefixed_files"] > 0:
+        logging.error(str(traces.header["unprefixed_files"]) + " filenames do not start with prefix " +
+                      linux + " in trace files " + str(filenames))
+        session.warnings += traces.header["unprefixed_files"]
     return traces
 
 
@@ -505,59 +775,43 @@ def parse_crash_info(filename):
     return crash_info
 
 
-def analyze_traces(result):
-    global result_cache
-    global original_crash
-    crash = result_cache[original_crash]
+def analyze_traces(session, result):
+    return analyze_all_traces(session, [result])[0]
 
-    if "traces" not in crash or "traces" not in result or crash["traces"] is None or result["traces"] is None:
+
+# Scores all crashed runs of a commit against the original crash at once, None for runs without traces
+def analyze_all_traces(session, results):
+    crash = session.result_cache[session.original_crash]
+
+    if "traces" not in crash or crash["traces"] is None:
         # TODO
         # trace_intersection_score = None
-        return None
-    else:
-        trace_intersection_score = calc_trace_intersection_score(
-            result["traces"], crash["traces"], crash["crashtrace"])
-    equal_crash_score = calc_equal_crash_score(
-        result["crash_info"], crash["crash_info"])
-    crash_location_similarity_score = calc_crash_location_similarity_score(result["crashtrace"],
-                                                                           crash["crashtrace"])
-    if trace_intersection_score is not None:
-        return (trace_intersection_score + equal_crash_score + crash_location_similarity_score) / 3
-    else:
-        return (equal_crash_score + crash_location_similarity_score) / 2
+        return [None] * len(results)
+
+    scorable = [result for result in results if "traces" in result and result["traces"] is not None]
+    trace_intersection_scores = session.scoring.trace_intersection_scores(
+        [result["traces"] for result in scorable], crash["traces"], crash["crashtrace"])
+    crash_location_similarity_scores = session.scoring.crash_location_similarity_scores(
+        [result["crashtrace"] for result in scorable], crash["crashtrace"])
+
+    trace_weight, equal_crash_weight, crash_location_weight = session.score_weights
+    scores = {}
+    for result, trace_intersection_score, crash_location_similarity_score in zip(
+            scorable, trace_intersection_scores, crash_location_similarity_scores):
+        equal_crash_score = calc_equal_crash_score(
+            result["crash_info"], crash["crash_info"])
+        scores[id(result)] = (trace_weight * trace_intersection_score + equal_crash_weight * equal_crash_score +
+                              crash_location_weight * crash_location_similarity_score) / \
+            (trace_weight + equal_crash_weight + crash_location_weight)
+    return [scores.get(id(result)) for result in results]
 
 
 def get_executed_files(traces):
-    return set([trace["file"] for trace in traces])
-
-
-def calc_trace_intersection_score(suspect_trace, crash_execution_trace, crash_stacktrace):
-    functions_suspect_trace = set([trace["function"]
-                                  for trace in suspect_trace])
-    functions_crash_trace = set([trace["function"]
-                                for trace in crash_execution_trace])
-    functions_stacktrace = set([trace["function"]
-                               for trace in crash_stacktrace])
-    intersection_functions = functions_suspect_trace.intersection(
-        functions_crash_trace)
-    intersection_functions_stacktrace = functions_suspect_trace.intersection(
-        functions_stacktrace)
-
-    files_suspect_trace = get_executed_files(suspect_trace)
-    files_crash_trace = get_executed_files(crash_execution_trace)
-    files_stacktrace = get_executed_files(crash_stacktrace)
-    intersection_files = files_suspect_trace.intersection(files_crash_trace)
-    intersection_files_stacktrace = files_suspect_trace.intersection(
-        files_stacktrace)
-
-    function_score = len(intersection_functions) / len(functions_crash_trace)
-    file_score = len(intersection_files) / len(files_crash_trace)
-    function_score_stacktrace = len(
-        intersection_functions_stacktrace) / len(functions_stacktrace)
-    file_score_stacktrace = len(
-        intersection_files_stacktrace) / len(files_stacktrace)
-
-    return (function_score + file_score + function_score_stacktrace + file_score_stacktrace) / 4
+    return traces.file_set()
+
+
+def calc_trace_intersection_score(session, suspect_trace, crash_execution_trace, crash_stacktrace):
+    return session.scoring.trace_intersection_scores([suspect_trace], crash_execution_trace, crash_stacktrace)[0]
 
 
 # equal crash / equal crash category
@@ -583,125 +837,197 @@ def calc_equal_crash_score(crash_info_suspect, crash_info_crash):
     return (equal_title_score + equal_category_score) / 2
 
 
-def calc_crash_location_similarity_score(crash_stacktrace_suspect, crash_stacktrace_crash):
+def calc_crash_location_similarity_score(session, crash_stacktrace_suspect, crash_stacktrace_crash):
     # TODO maybe check the function mentioned in the title?
     # TODO put higher weight on the where the error was triggerd
-    functions_stacktrace_suspect = set(
-        [trace["function"] for trace in crash_stacktrace_suspect])
-    functions_stacktrace_crash = set(
-        [trace["function"] for trace in crash_stacktrace_crash])
-    intersection_functions = set(functions_stacktrace_suspect).intersection(
-        set(functions_stacktrace_crash))
-
-    return len(intersection_functions) / len(functions_stacktrace_crash)
-
-
-done_regex = re.compile(
-    "([0-9a-f]{40}) is the first bad commit",
-    re.MULTILINE)
-bisecting_regex = re.compile(
-    r"Bisecting: ([0-9]+) revisions? left to test after this \(roughly [0-9]+ steps?\)\n\[([0-9a-f]{40})\] .*",
-    re.MULTILINE)
-multi_commit_regex = re.compile(
-    "There are only 'skip'ped commits left to test.\nThe first bad commit could be any of: *\n((?:[0-9a-f]{40}\n)*)",
-    re.MULTILINE)
-
-
-def parse_bisection_output(output):
-    logging.info("Parsing bisection output: \"" + output + "\"")
-    if re.match(done_regex, output):
-        logging.info("=> done")
-        return {"status": "done", "commits": [re.match(done_regex, output).group(1)], "revisions_left": 0}
-    if re.match(multi_commit_regex, output):
-        commits = []
-        for commit in re.findall(multi_commit_regex, output):
-            commits.append(commit)
-        logging.info("=> multi-done")
-        return {"status": "done", "commits": commits, "revisions_left": 0}
-    if re.match(bisecting_regex, output):
-        re_result = re.match(bisecting_regex, output)
-        next_commit = re_result.group(2)
-        logging.info("=> next commit: " + next_commit)
-        return {"status": "bisecting", "next_commit": next_commit, "revisions_left": int(re_result.group(1))}
-    raise Exception("Unexpected bisection output: " + output)
-
-
-def bisect(args, directory, last_good_major, reproducer, executed_files):
-    global summary
-    logging.info("Starting bisection")
-    summary += "> Bisect\n"
-    repo = git.Repo(args.linux)
-    output = repo.git.bisect("start", "--", *executed_files)
-    assert output == ""
-    output = repo.git.bisect("good", last_good_major)
-    assert output == ""
-    output = repo.git.bisect("bad", reproducer["data"]["kernel-source-commit"])
-
-    parsed_output = parse_bisection_output(output)
-    assert "next_commit" in parsed_output
-    current = parsed_output["next_commit"]
+    return session.scoring.crash_location_similarity_scores([crash_stacktrace_suspect], crash_stacktrace_crash)[0]
+
+
+def bisect_decision(session, verdict):
+    if verdict == INVALID:
+        logging.info("Invalid")
+        return "skip"
+    elif verdict == GOOD:
+        logging.info("No crash")
+        return "good"
+    elif verdict > session.different_crash_threshold:
+        logging.info("Same crash")
+        return "bad"
+    else:
+        logging.info("Probably a different crash, skipping")
+        return "skip"
+
+
+# Bisects last_good_major..bad in process over the commits which changed the executed files. With
+# args.multisect > 1 several commits are tested concurrently per step, each in its own probe workspace, and the
+# remaining range shrinks to about 1/(k+1) per step instead of 1/2.
+def bisect(session, last_good_major, executed_files):
+    args = session.args
+    if args.noisy:
+        return noisy_bisect(session, last_good_major, executed_files)
+    k = args.multisect
+    logging.info("Starting bisection with " + str(k) + " commit(s) per step")
+    session.summary += "> Bisect\n" if k == 1 else "> Multisect (k=" + str(k) + ")\n"
+    graph, bad = load_bisection_graph(session, last_good_major, executed_files)
+    bisection = Bisection(graph, bad)
+
+    # returns the decision which was applied, a contradicting one counts as skip instead of ending the bisection
+    def mark(commit, decision):
+        if bisection.contradicts(commit, decision):
+            logging.warning("Verdict " + decision + " on " + commit + " contradicts earlier verdicts, skipping it")
+            session.summary += "=> contradicts earlier verdicts, skipped\n"
+            decision = "skip"
+        bisection.mark(commit, decision)
+        if decision == "bad":
+            earliest_bad = graph.index.get(session.earliest_bad)
+            if earliest_bad is None or graph.ancestors(graph.index[commit]) & ~graph.ancestors(earliest_bad) == 0:
+                session.earliest_bad = commit
+        return decision
+
     skip_counter = 0
     tests = 0
-    while True:
-        if skip_counter > 5:
-            if parsed_output["revisions_left"] > 10:
-                return []
-            else:
+    try:
+        for step_commit, decision in session.state["bisect_steps"]:
+            logging.info("Resuming bisection step " + decision + " " + step_commit)
+            session.summary += ">> Resume " + step_commit + " => " + decision + "\n"
+            if mark(step_commit, decision) == "skip":
+                skip_counter += 1
+
+        probes = []
+        while not bisection.is_done():
+            if skip_counter > 5:
+                if bisection.remaining() > 10:
+                    return []
                 logging.info("Too many skips, skipping rest of bisection")
-                output = repo.git.bisect("skip", current)
-        else:
-            logging.info("================= " + current + " =================")
-
-            test(args, directory, reproducer, current, already_checked_out=True)
-            tests += 1
-            repo.git.restore(".")
-
-            verdict = analyze_results(args, directory, current)
-            summary += ">> Test " + current + \
-                " => " + verdict_str(verdict) + "\n"
-            try:
-                if verdict == INVALID:
-                    logging.info("Invalid")
-                    skip_counter += 1
-                    output = repo.git.bisect("skip", current)
-                elif verdict == GOOD:
-                    logging.info("No crash")
-                    output = repo.git.bisect("good", current)
-                elif verdict > different_crash_tresh_hold:
-                    logging.info("Same crash")
-                    global earliest_bad
-                    earliest_bad = current
-                    output = repo.git.bisect("bad", current)
-                else:
-                    logging.info("Probably a different crash, skipping")
+                break
+
+            commits = bisection.next_commits(k)
+            logging.info(str(bisection.remaining()) + " candidates left, testing " + str(commits))
+            if len(commits) > 1 and len(probes) < len(commits) and not session.replay:
+                probes = setup_probe_workspaces(args, k)
+            run_tests(session, commits, probes)
+            tests += len(commits)
+
+            for commit in commits:
+                verdict = analyze_results(session, commit)
+                record_verdict(session, commit, verdict)
+                session.summary += ">> Test " + commit + " => " + verdict_str(verdict) + "\n"
+                decision = mark(commit, bisect_decision(session, verdict))
+                if decision == "skip":
                     skip_counter += 1
-                    output = repo.git.bisect("skip", current)
-            except git.GitCommandError as e:
-                try:
-                    if re.match(multi_commit_regex, e.stdout):
-                        commits = re.findall(multi_commit_regex, e.stdout)[0].splitlines()
-                        print("=> multi-done")
-                        return {"status": "done", "commits": commits, "revisions_left": 0}
-                    elif re.match(multi_commit_regex, e.stderr):
-                        commits = re.findall(multi_commit_regex, e.stderr)[0].splitlines()
-                        print("=> multi-done")
-                        return {"status": "done", "commits": commits, "revisions_left": 0}
-                except:
-                    logging.error(e)
-                    logging.error("Bisection failed")
-                    return []
+                record_bisect_step(session, commit, decision)
+    except Exception as e:
+        logging.error(e)
+        logging.error("Bisection failed")
+        return []
+
+    logging.info("Bisection done after " + str(tests) + " tests.")
+    return bisection.result()
+
 
+# Opened on first use, the index is shared by all sessions and workers on the same kernel repository
+def get_commit_index(session):
+    if session.commit_index is None:
+        session.commit_index = CommitIndex(session.args.linux)
+    return session.commit_index
 
 
-        bisection_output = parse_bisection_output(output)
-        if bisection_output["status"] == "done":
-            logging.info("Bisection done after " + str(tests) + " tests.")
-            return bisection_output["commits"]
-        current = bisection_output["next_commit"]
+def load_bisection_graph(session, last_good_major, executed_files):
+    bounds = session.state["bounds"]
+    bad = gitservice.get(session.args.linux).rev_parse(bounds["bad"] or session.reproducer["data"]["kernel-source-commit"])
+    graph = CommitGraph(get_commit_index(session).rev_list(bad, [last_good_major] + bounds["good"], executed_files),
+                        bad)
+    logging.info("Bisection range contains " + str(len(graph)) + " commits")
+    return graph, bad
 
 
-def test(args, repro_folder, reproducer, commit, already_checked_out=False):
-    if validate_repro_folder(args, repro_folder, commit) and args.cache:
+def run_tests(session, commits, probes):
+    if len(commits) == 1:
+        logging.info("================= " + commits[0] + " =================")
+        test(session, commits[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(commits)) as executor:
+            futures = [executor.submit(test, session, commit, probe_args)
+                       for commit, probe_args in zip(commits, probes)]
+            for future in futures:
+                future.result()
+
+
+# Bisection for flaky reproducers: keeps a probability for every candidate, fed by how many of the runs on a
+# commit reproduced the original crash, and stops once one candidate reaches args.confidence.
+def noisy_bisect(session, last_good_major, executed_files):
+    args = session.args
+    k = args.multisect
+    logging.info("Starting noisy bisection with confidence " + str(args.confidence))
+    session.summary += "> Noisy bisect\n"
+    graph, bad = load_bisection_graph(session, last_good_major, executed_files)
+
+    crashes, runs = session.run_counts.get(session.original_crash, (0, 0))
+    reproduction_rate = min(0.99, max(0.1, crashes / runs if runs > 0 else 0.5))
+    logging.info("Reproduction rate on original commit: " + str(crashes) + "/" + str(runs) +
+                 ", using " + str(reproduction_rate))
+    bisection = ProbabilisticBisection(graph, bad, reproduction_rate)
+
+    def observe(commit, crashes, runs):
+        bisection.observe(commit, crashes, runs)
+        if crashes > 0 and commit in graph.index:
+            earliest_bad = graph.index.get(session.earliest_bad)
+            if earliest_bad is None or graph.ancestors(graph.index[commit]) & ~graph.ancestors(earliest_bad) == 0:
+                session.earliest_bad = commit
+
+    tests = 0
+    try:
+        for commit, crashes, runs in session.state["observations"]:
+            logging.info("Resuming observation " + str(crashes) + "/" + str(runs) + " on " + commit)
+            session.summary += ">> Resume " + commit + " => " + str(crashes) + "/" + str(runs) + "\n"
+            observe(commit, crashes, runs)
+
+        probes = []
+        while True:
+            culprit, probability = bisection.most_likely()
+            if probability >= args.confidence:
+                break
+            commits = bisection.next_commits(k, max_num_tests)
+            if len(commits) == 0:
+                logging.info("No commit left which promises information, stopping noisy bisection")
+                break
+            logging.info("Most likely culprit " + culprit + " (" + str(round(probability, 3)) + "), testing " +
+                         str(commits))
+            if len(commits) > 1 and len(probes) < len(commits) and not session.replay:
+                probes = setup_probe_workspaces(args, k)
+            run_tests(session, commits, probes)
+            tests += len(commits)
+
+            for commit in commits:
+                verdict = analyze_results(session, commit)
+                record_verdict(session, commit, verdict)
+                crashes, runs = session.run_counts[commit]
+                session.summary += ">> Test " + commit + " => " + verdict_str(verdict) + " (" + str(crashes) + \
+                    "/" + str(runs) + ")\n"
+                session.state["observations"].append([commit, crashes, runs])
+                save_bisect_state(session)
+                observe(commit, crashes, runs)
+    except Exception as e:
+        logging.error(e)
+        logging.error("Noisy bisection failed")
+        return []
+
+    culprit, probability = bisection.most_likely()
+    logging.info("Noisy bisection done after " + str(tests) + " tests, most likely culprit " + culprit + " (" +
+                 str(round(probability, 3)) + ")")
+    return bisection.credible_set(args.confidence)
+
+
+def test(session, commit, args=None):
+    if session.replay:
+        # only results which are already on disk are used
+        return
+    # args can point to a different workspace (see setup_probe_workspaces)
+    if args is None:
+        args = session.args
+    repro_folder = session.reproducer_directory
+    # Commits which were analyzed before an interruption are reused like with --cache
+    if validate_repro_folder(session, commit) and (args.cache or commit in session.state["verdicts"]):
         logging.info("Using cached results for " + commit + ".")
         return
 
@@ -723,11 +1049,12 @@ def test(args, repro_folder, reproducer, commit, already_checked_out=False):
     write_status_path(commit_folder, status)
 
     reason = reproduce_crash(commit_folder, args.baseline_config, args.kernel_repository,
-                             args.kernel_branch,
-                             "commit_already_checked_out" if already_checked_out else commit,
+                             args.kernel_branch, commit,
                              args.syzkaller_repository, args.syzkaller_branch,
-                             data["syzkaller-commit"], tracedir=commit_folder, print_output=False, datadir=repro_folder)
+                             data["syzkaller-commit"], tracedir=commit_folder, print_output=False, datadir=repro_folder,
+                             kernel_dir=args.kernel_dir, syzkaller_dir=args.syzkaller_changing, http_port=args.http_port)
     status = load_status(commit_folder)
+    status["linux"] = args.linux
     if reason == "good" or reason == "bad":
         status["retest_state"] = "done"
         status["verdict"] = reason
@@ -743,12 +1070,12 @@ def test(args, repro_folder, reproducer, commit, already_checked_out=False):
                  " (Total time: " + str(datetime.datetime.now() - start_time_reproducer) + ")")
 
 
-def validate_repro_folder(args, repro_folder, commit):
+def validate_repro_folder(session, commit):
+    args = session.args
     commit_folder = os.path.join(
-        repro_folder, experiment_name, "traces", commit)
+        session.reproducer_directory, experiment_name, "traces", commit)
     status = load_status(commit_folder)
 
-    global warnings
     if status["retest_state"] == "not_retested":
         return False
     if status["retest_state"] == "running" or status["retest_state"] == "failed":
@@ -797,7 +1124,7 @@ def extract_commits(output):
     return re.findall(regexp, output)
 
 
-def select_culprit(args, repo, candidate_list):
+def select_culprit(session, candidate_list):
     max_score = -1
     culprit = None
     for candidate in candidate_list:
@@ -806,7 +1133,7 @@ def select_culprit(args, repo, candidate_list):
         fix_intersection_score = None
 
         trace_intersection_score = calc_commit_trace_intersection_score(
-            candidate, repo)
+            session, candidate)
 
         if fix_intersection_score is not None:
             score = (fix_intersection_score + trace_intersection_score) / 2
@@ -817,30 +1144,28 @@ def select_culprit(args, repo, candidate_list):
             max_score = score
             culprit = candidate
 
-    global summary
-    summary += "Culprit: " + str(culprit) + \
+    session.summary += "Culprit: " + str(culprit) + \
         " (score: " + str(max_score) + ")\n"
 
     return culprit
 
 
-def calc_commit_trace_intersection_score(commit, repo):
-    global warnings
+def calc_commit_trace_intersection_score(session, commit):
     # get all files which were changed in the commit
-    files = repo.git.show("--pretty=", "--name-only", commit).splitlines()
+    files = get_commit_index(session).changed_paths(commit)
 
     # get all files which were executed in the last reproducer
-    global result_cache
-    global earliest_bad
+    earliest_bad = session.earliest_bad
+    result_cache = session.result_cache
     if earliest_bad is None or earliest_bad not in result_cache:
         raise Exception(
-            "No result cache entry for earliest bad " + earliest_bad)
+            "No result cache entry for earliest bad " + str(earliest_bad))
     if "traces" in result_cache[earliest_bad]:
         last_reproducible_traces = result_cache[earliest_bad]["traces"]
     elif "crashtrace" in result_cache[earliest_bad]:
         logging.error("No traces found for earliest bad " +
                       earliest_bad + ", using crashtrace instead.")
-        warnings += 1
+        session.warnings += 1
         last_reproducible_traces = result_cache[earliest_bad]["crashtrace"]
     else:
         raise Exception(
@@ -850,10 +1175,9 @@ def calc_commit_trace_intersection_score(commit, repo):
                       str(result_cache[earliest_bad]))
         return 0
 
-    last_reproducible_files = [trace_entry["file"]
-                               for trace_entry in last_reproducible_traces]
+    last_reproducible_files = get_executed_files(last_reproducible_traces)
 
-    intersection = set(files).intersection(set(last_reproducible_files))
+    intersection = set(files).intersection(last_reproducible_files)
 
     return len(intersection)
 
@@ -884,14 +1208,13 @@ def calc_commit_trace_intersection_score(commit, repo):
 # 	intersects fix 0-100
 
 def signal_handler(sig, frame):
-    global stop
     sys.exit(0)
-    if stop:
+    if stop_event.is_set():
         logging.info("Forcing exit\n")
         sys.exit(0)
     else:
         logging.info(
             'You pressed Ctrl+C, stopping after current bictracking is done\n')
-        stop = True
+        stop_event.set()
         # Prevent stop of subprocesses
         signal.signal(signal.SIGINT, signal.SIG_IGN)
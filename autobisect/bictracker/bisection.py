@@ -0,0 +1,268 @@
+import bisect
+import logging
+import math
+
+from autobisect.bictracker.scoring import popcount
+
+# Bisection over the commit graph of good..bad, kept completely in memory.
+#
+# Every commit gets a bit, ancestors(c) is the set of commits in the range that c contains (including c). The
+# commits which can still be the first bad one are kept as a bitset as well:
+# 	- c is bad:  candidates &= ancestors(c)
+# 	- c is good: candidates &= ~ancestors(c)
+# 	- c is skipped: it stays a candidate but is not tested again
+# This is what git bisect does, without spawning git for every step, and it allows to pick several commits per
+# step and to test them concurrently.
+#
+# The graph only keeps the commits in topological order and their parents, ancestors(c) is walked when it is needed.
+# Keeping the ancestor set of every commit would grow quadratically (about 500 MB for 60k commits), an unfiltered
+# range between two releases has 200k.
+
+
+class CommitGraph:
+    # rev_list_output: output of "git rev-list --topo-order --parents good..bad [-- paths]", newest first
+    def __init__(self, rev_list_output, bad):
+        self.commits = []
+        self.parents = []
+        for line in rev_list_output.splitlines():
+            hashes = line.split()
+            if len(hashes) == 0:
+                continue
+            self.commits.append(hashes[0])
+            self.parents.append(hashes[1:])
+
+        if bad not in self.commits:
+            # bad does not touch the filtered paths, it still is the known bad end of the range
+            children = set(parent for parents in self.parents for parent in parents)
+            heads = [commit for commit in self.commits if commit not in children]
+            self.commits.insert(0, bad)
+            self.parents.insert(0, heads)
+
+        self.index = {commit: i for i, commit in enumerate(self.commits)}
+        # parents outside of the range are dropped, they are good
+        self.parents = [[self.index[parent] for parent in parents if parent in self.index] for parents in self.parents]
+        # ancestors of the commits asked for last, a bisection step asks for the same ones several times
+        self.ancestor_cache = {}
+
+    def __len__(self):
+        return len(self.commits)
+
+    # Bitset of the commits in the range which commit i contains (including i)
+    def ancestors(self, i):
+        if i in self.ancestor_cache:
+            return self.ancestor_cache[i]
+        seen = bytearray(len(self.commits))
+        seen[i] = 1
+        stack = [i]
+        while len(stack) > 0:
+            for parent in self.parents[stack.pop()]:
+                if not seen[parent]:
+                    seen[parent] = 1
+                    stack.append(parent)
+        # bit j is seen[j], int() reads base 2 strings in linear time
+        bits = int(seen.translate(bit_digits)[::-1], 2)
+        if len(self.ancestor_cache) >= 64:
+            self.ancestor_cache.clear()
+        self.ancestor_cache[i] = bits
+        return bits
+
+    # Indices of the commits in bits, in topological order
+    def indices_of(self, bits):
+        digits = bin(bits)[:1:-1]
+        return [i for i, digit in enumerate(digits) if digit == "1"]
+
+    def commits_of(self, bits):
+        return [self.commits[i] for i in self.indices_of(bits)]
+
+
+bit_digits = bytes.maketrans(b"\x00\x01", b"01")
+
+
+# untested commits around each target position of next_commits whose weight is computed
+shortlist_width = 8
+
+
+class Bisection:
+    def __init__(self, graph, bad):
+        self.graph = graph
+        self.candidates = graph.ancestors(graph.index[bad])
+        self.bads = 1 << graph.index[bad]
+        self.skipped = 0
+
+    def remaining(self):
+        return popcount(self.candidates)
+
+    def untested(self):
+        return self.candidates & ~self.skipped & ~self.bads
+
+    def is_done(self):
+        return self.remaining() <= 1 or self.untested() == 0
+
+    # The possible first bad commits, a single one unless only skipped commits are left
+    def result(self):
+        return self.graph.commits_of(self.candidates)
+
+    # Whether the decision leaves no candidate, i.e. it contradicts earlier ones. With a flaky reproducer the
+    # verdicts of one step can do that, e.g. a descendant of a bad commit comes back good.
+    def contradicts(self, commit, decision):
+        if commit not in self.graph.index:
+            return False
+        ancestors = self.graph.ancestors(self.graph.index[commit])
+        if decision == "good":
+            return self.candidates & ~ancestors == 0
+        elif decision == "bad":
+            return self.candidates & ancestors == 0
+        return False
+
+    def mark(self, commit, decision):
+        if commit not in self.graph.index:
+            logging.warning("Commit " + commit + " is not part of the bisection range, ignoring " + decision)
+            return
+        i = self.graph.index[commit]
+        if decision == "good":
+            self.candidates &= ~self.graph.ancestors(i)
+        elif decision == "bad":
+            self.candidates &= self.graph.ancestors(i)
+            self.bads |= 1 << i
+        elif decision == "skip":
+            self.skipped |= 1 << i
+        else:
+            raise Exception("Unknown bisection decision " + decision)
+        if self.candidates == 0:
+            raise Exception("Inconsistent bisection decisions, no candidate left after " + decision + " " + commit)
+
+    # Picks k untested commits which split the remaining candidates into k + 1 parts of about the same size.
+    # Commits close to a skipped commit are avoided, as build or boot failures tend to cover a whole series.
+    # A commit at position r of the candidates in topological order contains about total - r of them, so only the
+    # untested commits around the positions of the targets are weighed exactly.
+    def next_commits(self, k):
+        untested = self.untested()
+        if untested == 0:
+            return []
+        total = self.remaining()
+        candidates = self.graph.indices_of(self.candidates)
+        untested_indices = set(self.graph.indices_of(untested))
+        # positions of the untested commits among the candidates
+        positions = [position for position, i in enumerate(candidates) if i in untested_indices]
+        shortlist = set()
+        for j in range(1, k + 1):
+            nearest = bisect.bisect_left(positions, total - total * j / (k + 1))
+            for position in positions[max(0, nearest - shortlist_width):nearest + shortlist_width]:
+                shortlist.add(candidates[position])
+        weights = [(popcount(self.graph.ancestors(i) & self.candidates), i) for i in sorted(shortlist)]
+        skipped_weights = [popcount(self.graph.ancestors(i) & self.candidates)
+                           for i in self.graph.indices_of(self.skipped & self.candidates)]
+        cluster_gap = max(1, total // 10) if len(skipped_weights) > 0 else 0
+
+        def cost(weight, target):
+            distance = abs(weight - target)
+            for skipped_weight in skipped_weights:
+                if abs(weight - skipped_weight) < cluster_gap:
+                    distance += cluster_gap - abs(weight - skipped_weight)
+            return distance
+
+        picked = []
+        for j in range(1, k + 1):
+            target = total * j / (k + 1)
+            best = None
+            for weight, i in weights:
+                if i in picked:
+                    continue
+                if best is None or cost(weight, target) < best[0]:
+                    best = (cost(weight, target), i)
+            if best is None:
+                break
+            picked.append(best[1])
+        return [self.graph.commits[i] for i in picked]
+
+
+def binomial_pmf(n, p):
+    return [math.comb(n, c) * p ** c * (1 - p) ** (n - c) for c in range(n + 1)]
+
+
+def entropy(distribution):
+    return -sum(p * math.log2(p) for p in distribution if p > 0)
+
+
+# Noisy bisection for reproducers which do not crash on every run. Instead of a hard good/bad per commit it keeps
+# the probability of every candidate being the first bad commit. Testing commit t with n runs and c crashes is
+# likely if t contains the culprit (each run crashes with reproduction_rate) and unlikely otherwise (each run
+# crashes with false_positive_rate). The next commit is the one whose outcome is expected to tell most about the
+# culprit (mutual information), and bisection stops once one candidate reaches the requested confidence.
+class ProbabilisticBisection:
+    def __init__(self, graph, bad, reproduction_rate, false_positive_rate=0.01):
+        self.graph = graph
+        self.reproduction_rate = reproduction_rate
+        self.false_positive_rate = false_positive_rate
+        candidates = graph.indices_of(graph.ancestors(graph.index[bad]))
+        self.probabilities = {i: 1 / len(candidates) for i in candidates}
+        self.tested = {graph.index[bad]}
+
+    def contained(self, i):
+        ancestors = set(self.graph.indices_of(self.graph.ancestors(i)))
+        return [j for j in self.probabilities if j in ancestors]
+
+    def bad_probability(self, i):
+        return sum(self.probabilities[j] for j in self.contained(i))
+
+    def observe(self, commit, crashes, runs):
+        if commit not in self.graph.index:
+            logging.warning("Commit " + commit + " is not part of the bisection range, ignoring observation")
+            return
+        i = self.graph.index[commit]
+        self.tested.add(i)
+        if runs == 0:
+            return
+        contained = set(self.contained(i))
+        p = self.reproduction_rate
+        q = self.false_positive_rate
+        likelihood_bad = p ** crashes * (1 - p) ** (runs - crashes)
+        likelihood_good = q ** crashes * (1 - q) ** (runs - crashes)
+        for j in self.probabilities:
+            self.probabilities[j] *= likelihood_bad if j in contained else likelihood_good
+        total = sum(self.probabilities.values())
+        if total == 0:
+            raise Exception("Observation " + str(crashes) + "/" + str(runs) + " on " + commit +
+                            " is impossible under the model")
+        for j in self.probabilities:
+            self.probabilities[j] /= total
+
+    def most_likely(self):
+        i = max(self.probabilities, key=self.probabilities.get)
+        return self.graph.commits[i], self.probabilities[i]
+
+    # Smallest set of commits which contains the culprit with the given probability, most likely first
+    def credible_set(self, confidence):
+        commits = []
+        mass = 0
+        for i in sorted(self.probabilities, key=self.probabilities.get, reverse=True):
+            commits.append(self.graph.commits[i])
+            mass += self.probabilities[i]
+            if mass >= confidence:
+                break
+        return commits
+
+    def information_gain(self, i, runs):
+        bad = self.bad_probability(i)
+        crashes_if_bad = binomial_pmf(runs, self.reproduction_rate)
+        crashes_if_good = binomial_pmf(runs, self.false_positive_rate)
+        crashes = [bad * b + (1 - bad) * g for b, g in zip(crashes_if_bad, crashes_if_good)]
+        return entropy(crashes) - bad * entropy(crashes_if_bad) - (1 - bad) * entropy(crashes_if_good)
+
+    # Evaluates the information gain only for commits around the quantiles of the probability mass along the
+    # topological order, computing it for every candidate would be quadratic in the range size.
+    def next_commits(self, k, runs):
+        order = sorted(self.probabilities, reverse=True)
+        shortlist = set()
+        mass = 0
+        quantile = 1
+        for position, i in enumerate(order):
+            mass += self.probabilities[i]
+            while quantile < 20 and mass >= quantile / 20:
+                for neighbour in order[max(0, position - 1):position + 2]:
+                    shortlist.add(neighbour)
+                quantile += 1
+        shortlist = [i for i in shortlist if i not in self.tested]
+
+        gains = sorted(((self.information_gain(i, runs), i) for i in shortlist), reverse=True)
+        return [self.graph.commits[i] for gain, i in gains[:k] if gain > 1e-6]
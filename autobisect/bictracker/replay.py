@@ -0,0 +1,126 @@
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+
+import git
+
+from autobisect.bictracker.session import BicTrackerSession
+from autobisect.common import load_data
+
+# Offline replay of bictracker runs. Every bisection is redone on the traces which are already stored in
+# <reproducer>/bictracker/traces, nothing is built or booted. Commits which were never tested count as skipped. This
+# allows to sweep the different crash threshold and the score weights over a whole dataset in minutes and compare
+# the culprits with the recorded ones.
+
+experiment_name = "bictracker"
+
+
+def parse_thresholds(thresholds):
+    return [float(threshold) for threshold in thresholds.split(",")]
+
+
+# "1:1:1,2:1:1" -> [(1.0, 1.0, 1.0), (2.0, 1.0, 1.0)] (trace intersection, equal crash, crash location)
+def parse_weights(weights):
+    parsed = []
+    for weight in weights.split(","):
+        values = tuple(float(value) for value in weight.split(":"))
+        if len(values) != 3:
+            raise Exception("Score weights need three values: " + weight)
+        parsed.append(values)
+    return parsed
+
+
+def weights_str(weights):
+    return ":".join("{:g}".format(weight) for weight in weights)
+
+
+def load_replayable(args):
+    replayable = []
+    for reprodir in sorted(os.listdir(args.reproducer_dir)):
+        if args.reproducer is not None and reprodir not in args.reproducer:
+            continue
+        directory = os.path.join(args.reproducer_dir, reprodir)
+        if not os.path.isdir(os.path.join(directory, experiment_name, "traces")):
+            continue
+        data = load_data(directory)
+        if data is None:
+            continue
+        replayable.append((directory, {"data": data}))
+    return replayable
+
+
+def recorded_culprit(reproducer_directory):
+    status_path = os.path.join(reproducer_directory, experiment_name, "status.json")
+    if not os.path.isfile(status_path):
+        return None
+    with open(status_path, "r") as status_file:
+        try:
+            return json.load(status_file).get("culprit")
+        except json.decoder.JSONDecodeError:
+            return None
+
+
+def replay_reproducer(task):
+    args, reproducer_directory, reproducer, min_good, configurations, run_bictracker = task
+    repo = git.Repo(args.linux)
+    traces_root = os.path.join(reproducer_directory, experiment_name, "traces")
+    available = set(os.listdir(traces_root))
+
+    results = []
+    for threshold, weights in configurations:
+        with BicTrackerSession(args, reproducer_directory, reproducer, different_crash_threshold=threshold,
+                               score_weights=weights, replay=True) as session:
+            status = run_bictracker(session, min_good, repo)
+            verdicts = session.state["verdicts"]
+            results.append({
+                "threshold": threshold,
+                "weights": weights,
+                "state": status["retest_state"],
+                "culprit": status.get("culprit", status.get("reason")),
+                "tested": len(verdicts),
+                "missing": len([commit for commit in verdicts if commit not in available]),
+                "warnings": session.warnings,
+            })
+    return reproducer["data"]["id"], recorded_culprit(reproducer_directory), results
+
+
+def print_table(replayed, configurations):
+    columns = ["t={:g} w={}".format(threshold, weights_str(weights)) for threshold, weights in configurations]
+    width = max([12] + [len(column) for column in columns])
+    print("{:<40} {:<12} ".format("reproducer", "recorded") + " ".join(column.ljust(width) for column in columns))
+    agreeing = [0] * len(configurations)
+    for reproducer_id, recorded, results in replayed:
+        cells = []
+        for i, result in enumerate(results):
+            culprit = str(result["culprit"])
+            if result["state"] == "done":
+                culprit = culprit[:12]
+                if recorded is not None and recorded.startswith(culprit):
+                    agreeing[i] += 1
+            if result["missing"] > 0:
+                culprit += " (" + str(result["missing"]) + " untested)"
+            cells.append(culprit[:width].ljust(width))
+        print("{:<40} {:<12} ".format(reproducer_id[:40], str(recorded)[:12]) + " ".join(cells))
+    print("{:<40} {:<12} ".format("agreeing with recorded culprit", "") +
+          " ".join((str(count) + "/" + str(len(replayed))).ljust(width) for count in agreeing))
+
+
+def start(args, min_good, run_bictracker):
+    configurations = list(itertools.product(parse_thresholds(args.replay_thresholds),
+                                            parse_weights(args.replay_weights)))
+    replayable = load_replayable(args)
+    logging.info("Replaying " + str(len(replayable)) + " reproducers with " + str(len(configurations)) +
+                 " configurations on " + str(args.jobs) + " processes")
+
+    tasks = [(args, directory, reproducer, min_good, configurations, run_bictracker)
+             for directory, reproducer in replayable]
+    if args.jobs > 1:
+        with multiprocessing.Pool(args.jobs) as pool:
+            replayed = pool.map(replay_reproducer, tasks, chunksize=1)
+    else:
+        replayed = [replay_reproducer(task) for task in tasks]
+
+    print_table(replayed, configurations)
+    return replayed
@@ -0,0 +1,76 @@
+import weakref
+
+# Scores traces on integer ids instead of strings. Every file and function name gets an id once per session and a
+# trace is represented by two bitsets (python ints), one over its files and one over its functions. The crash side
+# is encoded once and every run is scored with a handful of and/popcount operations, which keeps the results
+# identical to the set based formulas.
+
+
+class SymbolTable:
+    def __init__(self):
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def bitset(self, symbols):
+        ids = self.ids
+        positions = [ids.setdefault(symbol, len(ids)) for symbol in symbols]
+        bits = bytearray((len(ids) + 7) // 8)
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, "little")
+
+
+if hasattr(int, "bit_count"):
+    def popcount(bits):
+        return bits.bit_count()
+else:
+    def popcount(bits):
+        return bin(bits).count("1")
+
+
+class ScoringEngine:
+    def __init__(self):
+        self.files = SymbolTable()
+        self.functions = SymbolTable()
+        # trace object -> (file bitset, function bitset)
+        self.signatures = weakref.WeakKeyDictionary()
+
+    # traces are any object with file_set() and function_set() (trace store columns, cached summaries)
+    def signature(self, traces):
+        signature = self.signatures.get(traces)
+        if signature is None:
+            signature = (self.files.bitset(traces.file_set()), self.functions.bitset(traces.function_set()))
+            self.signatures[traces] = signature
+        return signature
+
+    def trace_intersection_scores(self, suspect_traces, crash_execution_trace, crash_stacktrace):
+        files_crash_trace, functions_crash_trace = self.signature(crash_execution_trace)
+        files_stacktrace, functions_stacktrace = self.signature(crash_stacktrace)
+        num_functions_crash_trace = popcount(functions_crash_trace)
+        num_files_crash_trace = popcount(files_crash_trace)
+        num_functions_stacktrace = popcount(functions_stacktrace)
+        num_files_stacktrace = popcount(files_stacktrace)
+
+        scores = []
+        for suspect_trace in suspect_traces:
+            files_suspect_trace, functions_suspect_trace = self.signature(suspect_trace)
+            function_score = popcount(functions_suspect_trace & functions_crash_trace) / num_functions_crash_trace
+            file_score = popcount(files_suspect_trace & files_crash_trace) / num_files_crash_trace
+            function_score_stacktrace = popcount(
+                functions_suspect_trace & functions_stacktrace) / num_functions_stacktrace
+            file_score_stacktrace = popcount(files_suspect_trace & files_stacktrace) / num_files_stacktrace
+            scores.append((function_score + file_score + function_score_stacktrace + file_score_stacktrace) / 4)
+        return scores
+
+    def crash_location_similarity_scores(self, suspect_stacktraces, crash_stacktrace):
+        _, functions_stacktrace_crash = self.signature(crash_stacktrace)
+        num_functions_stacktrace_crash = popcount(functions_stacktrace_crash)
+
+        scores = []
+        for suspect_stacktrace in suspect_stacktraces:
+            _, functions_stacktrace_suspect = self.signature(suspect_stacktrace)
+            scores.append(popcount(functions_stacktrace_suspect & functions_stacktrace_crash) /
+                          num_functions_stacktrace_crash)
+        return scores
@@ -0,0 +1,53 @@
+from autobisect.bictracker.scoring import ScoringEngine
+
+
+# Holds all state of one bictracker run on a single reproducer. A session is created when bictracking of a
+# reproducer starts and closed when it is done, so nothing leaks from one reproducer into the next and several
+# sessions can run side by side (threads, asyncio tasks).
+class BicTrackerSession:
+    def __init__(self, args, reproducer_directory, reproducer, different_crash_threshold=0.5,
+                 score_weights=(1, 1, 1), replay=False):
+        self.args = args
+        self.reproducer_directory = reproducer_directory
+        self.reproducer = reproducer
+
+        # verdicts above the threshold count as the original crash
+        self.different_crash_threshold = different_crash_threshold
+        # weights of trace intersection, equal crash and crash location score
+        self.score_weights = score_weights
+        # replay only analyzes results on disk, nothing is tested and no state is written
+        self.replay = replay
+
+        self.original_crash = None
+        self.earliest_bad = None
+        # commit -> result of the run which matched the original crash best ({} if no crash)
+        self.result_cache = {}
+        # commit -> (runs which reproduced the original crash, runs which could have reproduced it)
+        self.run_counts = {}
+        # file/function ids are only valid within this session
+        self.scoring = ScoringEngine()
+        # see get_commit_index
+        self.commit_index = None
+
+        # persisted progress of the bisection, see load_bisect_state
+        self.state = {"verdicts": {}}
+
+        self.summary = ""
+        self.warnings = 0
+
+    def close(self):
+        if self.commit_index is not None:
+            self.commit_index.close()
+            self.commit_index = None
+        self.result_cache.clear()
+        self.run_counts.clear()
+        self.scoring = ScoringEngine()
+        self.original_crash = None
+        self.earliest_bad = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
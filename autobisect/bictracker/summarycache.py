@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+
+# Persistent summary of the results of one traces/<commit> directory. It holds everything analyze_results needs
+# (crashed/valid flags, file and function sets of the traces, crash info) and is only used as long as the size and
+# mtime of every result file in the directory still match, so reruns with --cache do not parse any trace again.
+
+summary_filename = "summary.json"
+summary_version = 1
+
+source_prefixes = ("trace_", "crashtrace_", "crash_info_", "ok_", "invalid_")
+source_suffixes = (".csv", ".txt")
+
+
+class TraceSymbols:
+    def __init__(self, files, functions):
+        self.files = files
+        self.functions = functions
+
+    def file_set(self):
+        return set(self.files)
+
+    def function_set(self):
+        return set(self.functions)
+
+
+def source_stats(traces_directory, files):
+    stats = {}
+    for file in sorted(files):
+        if file.startswith(source_prefixes) and file.endswith(source_suffixes):
+            stat = os.stat(os.path.join(traces_directory, file))
+            stats[file] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def symbols_to_json(traces):
+    if traces is None:
+        return None
+    return {
+        "files": sorted(traces.file_set()),
+        "functions": sorted(traces.function_set()),
+    }
+
+
+def symbols_from_json(symbols):
+    if symbols is None:
+        return None
+    return TraceSymbols(symbols["files"], symbols["functions"])
+
+
+def result_to_json(result):
+    result_json = dict(result)
+    for key in ["traces", "crashtrace"]:
+        if key in result_json:
+            result_json[key] = symbols_to_json(result_json[key])
+    return result_json
+
+
+def result_from_json(result_json):
+    result = dict(result_json)
+    for key in ["traces", "crashtrace"]:
+        if key in result:
+            result[key] = symbols_from_json(result[key])
+    return result
+
+
+# Returns (results, parse warnings) or None if there is no summary or it is outdated
+def load_summary(traces_directory, files, linux):
+    summary_path = os.path.join(traces_directory, summary_filename)
+    if summary_filename not in files:
+        return None
+    try:
+        with open(summary_path, "r") as summary_file:
+            summary = json.load(summary_file)
+    except (OSError, ValueError) as e:
+        logging.warning("Could not read " + summary_path + ": " + str(e))
+        return None
+
+    if summary.get("version") != summary_version or summary.get("linux") != linux:
+        return None
+    if summary.get("sources") != source_stats(traces_directory, files):
+        logging.info("Summary " + summary_path + " is outdated")
+        return None
+    return [result_from_json(result) for result in summary["results"]], summary["parse_warnings"]
+
+
+def write_summary(traces_directory, files, linux, results, parse_warnings):
+    summary = {
+        "version": summary_version,
+        "linux": linux,
+        "sources": source_stats(traces_directory, files),
+        "parse_warnings": parse_warnings,
+        "results": [result_to_json(result) for result in results],
+    }
+    summary_path = os.path.join(traces_directory, summary_filename)
+    with open(summary_path + ".tmp", "w") as summary_file:
+        json.dump(summary, summary_file)
+    os.replace(summary_path + ".tmp", summary_path)
@@ -0,0 +1,63 @@
+import os
+import re
+
+# Parser for the cause bisection log of syzbot, which the crawler saves as <reproducer>/bisection/syz-bisect.log.
+# The lines of interest are the git bisect commands syzbot ran and its result:
+#
+# 	# git bisect start <bad> <good> [<good> ...]
+# 	# git bisect good <commit>
+# 	# git bisect bad <commit>
+# 	first bad commit: [<commit>] <title>
+
+bisect_log_path = os.path.join("bisection", "syz-bisect.log")
+
+command_re = re.compile(r"^#?\s*git bisect (start|good|bad|skip)\s+([0-9a-f\s]+)$")
+culprit_re = re.compile(r"^first bad commit: \[([0-9a-f]{40})\]")
+
+
+class SyzbotBisection:
+    def __init__(self):
+        # in the order syzbot decided them
+        self.good = []
+        self.bad = []
+        self.skip = []
+        self.culprit = None
+
+    def last_good(self):
+        return self.good[-1] if len(self.good) > 0 else None
+
+    # The oldest commit syzbot found bad
+    def first_bad(self):
+        if self.culprit is not None:
+            return self.culprit
+        return self.bad[-1] if len(self.bad) > 0 else None
+
+
+def parse(log):
+    bisection = SyzbotBisection()
+    for line in log.splitlines():
+        line = line.strip()
+        match = command_re.match(line)
+        if match:
+            command, commits = match.group(1), match.group(2).split()
+            if command == "start":
+                # a new bisection (e.g. after a config change) replaces the previous one
+                bisection = SyzbotBisection()
+                bisection.bad += commits[:1]
+                bisection.good += commits[1:]
+            else:
+                getattr(bisection, command).extend(commits)
+            continue
+        match = culprit_re.match(line)
+        if match:
+            bisection.culprit = match.group(1)
+    return bisection
+
+
+# Returns the parsed bisection or None if the reproducer has no bisection log
+def load(reproducer_directory):
+    path = os.path.join(reproducer_directory, bisect_log_path)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", errors="replace") as log_file:
+        return parse(log_file.read())
@@ -0,0 +1,242 @@
+import argparse
+import array
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+
+# Binary columnar store for the kcov traces written by syz-test-single.
+#
+# All trace_{i}_{j}.csv files of a run (or its crashtrace_{i}.csv) are converted once into a single file next to
+# them. Files and functions are interned into tables, the rows are stored as integer columns:
+#
+# 	magic "BCT1" | u32 header length | header (json) | padding to 4 bytes
+# 	u32[rows] file ids | u32[rows] function ids | i32[rows] lines | u8[rows] inline flags
+#
+# The header contains the string tables, the row count and the size/mtime of every source csv, so a store is
+# rebuilt automatically when a csv changes. Columns are read through a memory map without copying.
+
+magic = b"BCT1"
+store_version = 1
+
+trace_store_string = "trace_{}.bct"
+crashtrace_store_string = "crashtrace_{}.bct"
+
+
+class TraceColumns:
+    def __init__(self, files, functions, file_ids, function_ids, lines, inline, header=None, mapped=None):
+        self.files = files
+        self.functions = functions
+        self.file_ids = file_ids
+        self.function_ids = function_ids
+        self.lines = lines
+        self.inline = inline
+        self.header = header if header is not None else {}
+        # keeps the memory map alive as long as the columns are used
+        self._mapped = mapped
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def __getitem__(self, index):
+        line = self.lines[index]
+        return {
+            "file": self.files[self.file_ids[index]],
+            "function": self.functions[self.function_ids[index]],
+            "line": str(line) if line >= 0 else "",
+            "inline": self.inline[index] == 1,
+        }
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    # The tables only contain symbols which occur in at least one row
+    def file_set(self):
+        return set(self.files)
+
+    def function_set(self):
+        return set(self.functions)
+
+
+def source_stats(filenames):
+    stats = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        stats.append([os.path.basename(filename), stat.st_size, stat.st_mtime_ns])
+    return stats
+
+
+def strip_prefix(file, linux):
+    if file.startswith(linux + "/./"):
+        return file[len(linux + "/./"):], True
+    elif file.startswith(linux + "/"):
+        return file[len(linux + "/"):], True
+    return file, False
+
+
+def convert(filenames, store_filename, linux):
+    files = {}
+    functions = {}
+    file_ids = array.array("I")
+    function_ids = array.array("I")
+    lines = array.array("i")
+    inline = array.array("B")
+    invalid_rows = 0
+    unprefixed_files = 0
+
+    for filename in filenames:
+        with open(filename, "r") as f:
+            for row in csv.reader(f):
+                if row[3] != "true" and row[3] != "false":
+                    invalid_rows += 1
+                    continue
+                file, prefixed = strip_prefix(row[0], linux)
+                if not prefixed:
+                    unprefixed_files += 1
+                file_ids.append(files.setdefault(file, len(files)))
+                function_ids.append(functions.setdefault(row[1], len(functions)))
+                try:
+                    lines.append(int(row[2]))
+                except ValueError:
+                    lines.append(-1)
+                inline.append(1 if row[3] == "true" else 0)
+
+    header = {
+        "version": store_version,
+        "byteorder": sys.byteorder,
+        "linux": linux,
+        "rows": len(file_ids),
+        "sources": source_stats(filenames),
+        "invalid_rows": invalid_rows,
+        "unprefixed_files": unprefixed_files,
+        "files": list(files.keys()),
+        "functions": list(functions.keys()),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    padding = (-(len(magic) + 4 + len(header_bytes))) % 4
+
+    tmp_filename = store_filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        file_ids.tofile(f)
+        function_ids.tofile(f)
+        lines.tofile(f)
+        inline.tofile(f)
+    os.replace(tmp_filename, store_filename)
+    return header
+
+
+def read_header(f):
+    if f.read(len(magic)) != magic:
+        return None, 0
+    header_length = struct.unpack("<I", f.read(4))[0]
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    offset = len(magic) + 4 + header_length
+    return header, offset + (-offset) % 4
+
+
+def is_up_to_date(store_filename, filenames, linux):
+    if not os.path.isfile(store_filename):
+        return False
+    try:
+        with open(store_filename, "rb") as f:
+            header, _ = read_header(f)
+    except (OSError, ValueError, struct.error):
+        return False
+    if header is None or header["version"] != store_version or header["byteorder"] != sys.byteorder:
+        return False
+    return header["linux"] == linux and header["sources"] == source_stats(filenames)
+
+
+def load(store_filename):
+    with open(store_filename, "rb") as f:
+        header, offset = read_header(f)
+        if header is None:
+            raise Exception("Not a trace store: " + store_filename)
+        rows = header["rows"]
+        if rows == 0:
+            return TraceColumns(header["files"], header["functions"], array.array("I"), array.array("I"),
+                                array.array("i"), array.array("B"), header)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    file_ids = view[offset:offset + 4 * rows].cast("I")
+    offset += 4 * rows
+    function_ids = view[offset:offset + 4 * rows].cast("I")
+    offset += 4 * rows
+    lines = view[offset:offset + 4 * rows].cast("i")
+    offset += 4 * rows
+    inline = view[offset:offset + rows]
+    return TraceColumns(header["files"], header["functions"], file_ids, function_ids, lines, inline, header, mapped)
+
+
+# Returns the traces of the given csv files, converting them first if the store is missing or outdated
+def load_or_convert(filenames, store_filename, linux):
+    if not is_up_to_date(store_filename, filenames, linux):
+        logging.debug("Converting " + str(filenames) + " to " + store_filename)
+        convert(filenames, store_filename, linux)
+    return load(store_filename)
+
+
+def trace_files_of_run(files, i, max_num_tests):
+    return ["trace_{}_{}.csv".format(i, j) for j in range(max_num_tests) if "trace_{}_{}.csv".format(i, j) in files]
+
+
+def convert_directory(traces_directory, linux, max_num_tests=8):
+    files = os.listdir(traces_directory)
+    converted = 0
+    for i in range(max_num_tests):
+        trace_files = trace_files_of_run(files, i, max_num_tests)
+        if len(trace_files) > 0:
+            store_filename = os.path.join(traces_directory, trace_store_string.format(i))
+            trace_files = [os.path.join(traces_directory, file) for file in trace_files]
+            if not is_up_to_date(store_filename, trace_files, linux):
+                convert(trace_files, store_filename, linux)
+                converted += 1
+        if "crashtrace_{}.csv".format(i) in files:
+            store_filename = os.path.join(traces_directory, crashtrace_store_string.format(i))
+            crashtrace_files = [os.path.join(traces_directory, "crashtrace_{}.csv".format(i))]
+            if not is_up_to_date(store_filename, crashtrace_files, linux):
+                convert(crashtrace_files, store_filename, linux)
+                converted += 1
+    return converted
+
+
+# Kernel directory the commit was tested in as bictracker records it (probes test in their own worktree)
+def recorded_prefix(traces_directory, linux):
+    try:
+        with open(os.path.join(traces_directory, "status.json"), "r") as f:
+            return json.load(f).get("linux", linux)
+    except (OSError, ValueError):
+        return linux
+
+
+# Converts the traces of all tested commits of the given reproducer directories
+def main():
+    parser = argparse.ArgumentParser(description='Convert bictracker csv traces into the binary trace store')
+    parser.add_argument('--linux', required=True,
+                        help='Kernel directory prefix of the traced files, unless status.json of the commit has one')
+    parser.add_argument('reproducer_dirs', nargs='+', help='Reproducer directories')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+    for reproducer_dir in args.reproducer_dirs:
+        traces_root = os.path.join(reproducer_dir, "bictracker", "traces")
+        if not os.path.isdir(traces_root):
+            continue
+        for commit in os.listdir(traces_root):
+            traces_directory = os.path.join(traces_root, commit)
+            if os.path.isdir(traces_directory):
+                converted = convert_directory(traces_directory, recorded_prefix(traces_directory, args.linux))
+                logging.info("Converted " + str(converted) + " trace files in " + traces_directory)
+
+
+if __name__ == "__main__":
+    main()
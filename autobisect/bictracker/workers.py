@@ -0,0 +1,133 @@
+import copy
+import datetime
+import logging
+import multiprocessing
+import os
+import subprocess
+
+from autobisect.autobisect import CustomFormatter
+from autobisect.common import write_status_path
+
+# Every worker owns a directory below args.worker_dir:
+# workers
+# 	- worker_0
+# 		- linux (git worktree of args.linux)
+# 		- syzkaller-changing (local clone of args.syzkaller_changing)
+# 		- worker.log
+# 		- status.json
+# 	- ...
+
+
+def worker_directory(args, worker_id):
+    return os.path.abspath(os.path.join(args.worker_dir, "worker_" + str(worker_id)))
+
+
+# Creates a linux worktree and a syzkaller copy in directory and returns args which point to them
+def setup_workspace(args, directory, http_port):
+    os.makedirs(directory, exist_ok=True)
+
+    linux_worktree = os.path.join(directory, "linux")
+    if not os.path.exists(linux_worktree):
+        # Drop stale worktree registrations (e.g. after the worker directory was removed by hand)
+        subprocess.run(["git", "worktree", "prune"], cwd=args.linux)
+        logging.info("Creating linux worktree " + linux_worktree)
+        if subprocess.run(["git", "worktree", "add", "--detach", linux_worktree, "HEAD"],
+                          cwd=args.linux).returncode != 0:
+            raise Exception("Failed to create linux worktree " + linux_worktree)
+
+    syzkaller_copy = os.path.join(directory, "syzkaller-changing")
+    if not os.path.exists(syzkaller_copy):
+        # A worktree cannot be used here as every worker needs to check out master
+        logging.info("Creating syzkaller copy " + syzkaller_copy)
+        if subprocess.run(["git", "clone", "--quiet", os.path.abspath(args.syzkaller_changing), syzkaller_copy]).returncode != 0:
+            raise Exception("Failed to clone syzkaller into " + syzkaller_copy)
+
+    workspace_args = copy.copy(args)
+    workspace_args.linux = linux_worktree
+    workspace_args.kernel_dir = linux_worktree
+    workspace_args.syzkaller_changing = syzkaller_copy
+    workspace_args.http_port = http_port
+    return workspace_args
+
+
+def setup_worker_workspace(args, worker_id):
+    return setup_workspace(args, worker_directory(args, worker_id), args.http_port + worker_id)
+
+
+# Workspaces for testing several commits of one bisection concurrently. They are placed next to the kernel
+# directory of the caller, so every worker has its own set of probes.
+def setup_probe_workspaces(args, num_probes):
+    probe_root = os.path.join(os.path.dirname(os.path.abspath(args.kernel_dir)), "probes")
+    return [setup_workspace(args, os.path.join(probe_root, "probe_" + str(probe)),
+                            args.http_port + 100 * (probe + 1)) for probe in range(num_probes)]
+
+
+def write_worker_status(args, worker_id, status):
+    status["worker"] = worker_id
+    status["updated"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    write_status_path(worker_directory(args, worker_id), status)
+
+
+def run_worker(args, worker_id, queue, bic_track, min_good):
+    rootLogger = logging.getLogger()
+    fileh = logging.FileHandler(os.path.join(worker_directory(args, worker_id), "worker.log"))
+    fileh.setFormatter(CustomFormatter())
+    rootLogger.addHandler(fileh)
+
+    status = {"state": "setup", "reproducer": None, "finished": []}
+    write_worker_status(args, worker_id, status)
+    try:
+        worker_args = setup_worker_workspace(args, worker_id)
+    except Exception as e:
+        logging.error("Worker " + str(worker_id) + " setup failed: " + str(e))
+        status["state"] = "failed"
+        status["reason"] = str(e)
+        write_worker_status(args, worker_id, status)
+        return
+
+    while True:
+        item = queue.get()
+        if item is None:
+            break
+        directory, reproducer = item
+        logging.info("Worker " + str(worker_id) + " starts reproducer " + reproducer["data"]["id"])
+        status["state"] = "running"
+        status["reproducer"] = reproducer["data"]["id"]
+        write_worker_status(args, worker_id, status)
+
+        bic_track(worker_args, directory, min_good, reproducer)
+
+        status["finished"].append(reproducer["data"]["id"])
+        status["reproducer"] = None
+        write_worker_status(args, worker_id, status)
+
+    status["state"] = "done"
+    write_worker_status(args, worker_id, status)
+    rootLogger.removeHandler(fileh)
+
+
+def run_parallel(args, reproducers, bic_track, min_good):
+    num_workers = min(args.jobs, len(reproducers))
+    logging.info("Running " + str(len(reproducers)) + " reproducers on " + str(num_workers) + " workers")
+
+    # Worktrees are created up front and one after another, git locks the repository while adding them
+    for worker_id in range(num_workers):
+        setup_worker_workspace(args, worker_id)
+
+    queue = multiprocessing.Queue()
+    for reproducer in reproducers:
+        queue.put((os.path.join(args.reproducer_dir, reproducer["data"]["id"]), reproducer))
+    for _ in range(num_workers):
+        queue.put(None)
+
+    processes = []
+    for worker_id in range(num_workers):
+        process = multiprocessing.Process(target=run_worker, args=(args, worker_id, queue, bic_track, min_good),
+                                          name="bictrack-worker-" + str(worker_id))
+        process.start()
+        processes.append(process)
+
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            logging.error(process.name + " exited with code " + str(process.exitcode))
@@ -4,9 +4,9 @@ import signal
 import subprocess
 import sys
 import logging
-import git
 import shutil
 import json
+from autobisect import gitservice
 from autobisect.common import setup_workspace_for_bisection, load_reproducers, load_status, write_status, load_data
 
 experiment_name = "reproduce_original"
@@ -17,7 +17,8 @@ workspace_folder = "../workspace"
 
 def reproduce_crash(basedir, baseline_config,
                     kernel_repo, kernel_branch, kernel_commit,
-                    syzkaller_repository, syzkaller_branch, syzkaller_commit, tracedir, print_output=True, datadir=None):
+                    syzkaller_repository, syzkaller_branch, syzkaller_commit, tracedir, print_output=True, datadir=None,
+                    kernel_dir="linux", syzkaller_dir="syzkaller-changing", http_port=56741):
     if datadir is None:
         datadir = os.path.join(basedir, "..")
     
@@ -35,7 +36,7 @@ def reproduce_crash(basedir, baseline_config,
 
     vm_cfg_file = os.path.join(basedir, "vm.cfg")
     setup_workspace_for_bisection(basedir, crashdir, baseline_config, vm_cfg_file, workdir, kernel_repo, kernel_branch,
-                                  syzkaller_repository, syzkaller_branch, datadir)
+                                  syzkaller_repository, syzkaller_branch, datadir, kernel_dir, syzkaller_dir, http_port)
 
     command = [workspace_folder + "/syzkaller/bin/syz-test-single", "-tracedir", tracedir, "-crash", crashdir, "-config", vm_cfg_file,
                "-kernel_commit", kernel_commit, "-syzkaller_commit", syzkaller_commit, "-vv", "1000"]
@@ -76,11 +77,12 @@ def reproduce_crash(basedir, baseline_config,
         else:
             verdict = "unknown"
         logging.info("§+ Single test completed, verdict: " + verdict)
-        if verdict == "skip" and syzkaller_commit_is_old("syzkaller-changing", syzkaller_commit):
+        if verdict == "skip" and syzkaller_commit_is_old(syzkaller_dir, syzkaller_commit):
             logging.info("Verdict is skip, but syzkaller commit is old, so we try again with a newer commit")
             verdict = reproduce_crash(basedir, baseline_config,
                                    kernel_repo, kernel_branch, kernel_commit,
-                                   syzkaller_repository, syzkaller_branch, "6d752409f178135881da3510c910bb11ae1f1381", tracedir, print_output, datadir)
+                                   syzkaller_repository, syzkaller_branch, "6d752409f178135881da3510c910bb11ae1f1381", tracedir, print_output, datadir,
+                                   kernel_dir, syzkaller_dir, http_port)
             if verdict == "bad":
                 try:
                     data = load_data(datadir)
@@ -105,11 +107,10 @@ def reproduce_crash(basedir, baseline_config,
 
 
 def syzkaller_commit_is_old(syzkaller_repository, syzkaller_commit):
-    repo = git.Repo(syzkaller_repository)
     first_fixed_commit = "9d56e7ddd67e5ec46588c6434db739d94a7d2aae"
 
     # if syzkaller_commit is older than first_fixed_commit, it is old
-    return repo.is_ancestor(repo.commit(syzkaller_commit), repo.commit(first_fixed_commit))
+    return gitservice.get(syzkaller_repository).is_ancestor(syzkaller_commit, first_fixed_commit)
 
 
 def start(args):
@@ -0,0 +1,135 @@
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import threading
+
+# Content addressed store of the small files every test needs (kernel configs, reproducers, reproducer options):
+#
+# blobs
+# 	- <sha256[:2]>
+# 		- <sha256> (read-only)
+# 	- urls
+# 		- <sha256 of the URL> (sha256 of the content, for immutable downloads)
+#
+# Files are put into place by a hardlink to the blob, by a reflink if the target is on another file system which
+# supports it and by a copy otherwise. A hardlinked file is the blob itself, writing to it in place (a tool running as
+# root, an edited config) would change it for every directory sharing it. So only per-test scratch files which are
+# never written are hardlinked, files in the reproducer directories and files a tool may rewrite (kernel configs) get
+# a private reflink or copy (private=True). The crawler downloads a config or reproducer only once for all bugs which
+# share it.
+
+FICLONE = 0x40049409
+
+stores = {}
+stores_lock = threading.Lock()
+
+
+# Store of the directory shared by all callers of the process
+def get(directory):
+    key = os.path.abspath(directory)
+    with stores_lock:
+        if key not in stores:
+            stores[key] = BlobStore(directory)
+        return stores[key]
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(os.path.join(self.directory, "urls"), exist_ok=True)
+        # (path, size, mtime, inode) -> digest, files are only hashed again after they changed
+        self.digests = {}
+        self.lock = threading.Lock()
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def temporary(self, path):
+        return path + ".tmp." + str(os.getpid()) + "." + str(threading.get_ident())
+
+    def put_bytes(self, data):
+        digest = hash_bytes(data)
+        if not self.exists(digest):
+            os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+            tmp_path = self.temporary(self.path(digest))
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o444)
+            # concurrent puts of the same content write the same bytes
+            os.replace(tmp_path, self.path(digest))
+        return digest
+
+    def put_file(self, source):
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        with self.lock:
+            digest = self.digests.get(key)
+        if digest is None or not self.exists(digest):
+            with open(source, "rb") as f:
+                digest = self.put_bytes(f.read())
+            with self.lock:
+                self.digests[key] = digest
+        return digest
+
+    # Puts the blob at target, replacing what is there. private: target gets its own reflink or copy, which can be
+    # written to without changing the blob
+    def link(self, digest, target, private=False):
+        # rename() does nothing if both names are links to the same file, which would leave the temporary link behind
+        if not private and os.path.isfile(target) and os.path.samefile(self.path(digest), target):
+            return
+        tmp_target = self.temporary(target)
+        if private:
+            copy_or_reflink(self.path(digest), tmp_target)
+        else:
+            try:
+                os.link(self.path(digest), tmp_target)
+            except OSError as e:
+                if e.errno not in [errno.EXDEV, errno.EPERM, errno.EMLINK]:
+                    raise
+                copy_or_reflink(self.path(digest), tmp_target)
+        os.replace(tmp_target, target)
+
+    # Drop-in for shutil.copyfile
+    def copy(self, source, target, private=False):
+        self.link(self.put_file(source), target, private)
+
+    def url_path(self, url):
+        return os.path.join(self.directory, "urls", hash_bytes(url.encode("utf-8")))
+
+    # Digest of an immutable download, fetched with http only if it was not downloaded before
+    def fetch(self, http, url):
+        url_path = self.url_path(url)
+        if os.path.isfile(url_path):
+            with open(url_path, "r") as f:
+                digest = f.read().strip()
+            if self.exists(digest):
+                return digest
+        response = http.get(url, immutable=True)
+        # an error page must neither become a blob nor be remembered for the URL
+        if response.status_code != 200:
+            raise Exception("Fetching " + url + " returned " + str(response.status_code))
+        digest = self.put_bytes(response.content)
+        tmp_path = self.temporary(url_path)
+        with open(tmp_path, "w") as f:
+            f.write(digest)
+        os.replace(tmp_path, url_path)
+        return digest
+
+
+def copy_or_reflink(source, target):
+    with open(source, "rb") as source_file, open(target, "wb") as target_file:
+        try:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+            return
+        except OSError:
+            pass
+        shutil.copyfileobj(source_file, target_file)
@@ -0,0 +1,148 @@
+import logging
+import os
+import sqlite3
+import subprocess
+
+# Persistent index of the paths changed by every commit of a kernel repository, stored in sqlite next to the object
+# database (shared by all worktrees of the repository):
+#
+# 	commits(id, hash)
+# 	paths(id, path)
+# 	changes(commit_id, path_id), indexed in both directions
+#
+# Commits are indexed lazily, the first time a range containing them is queried, with a single git log over all
+# missing commits. Merges are stored without changes like git log shows them. A path filtered range therefore
+# contains the commits git rev-list -- <paths> lists, except that merges are always dropped and that no side of a
+# merge is pruned (git drops the other parents of a merge which is identical to one parent in the paths).
+
+index_filename = "autobisect-commit-index.sqlite"
+chunk_size = 500
+
+
+def chunks(items, size=chunk_size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class CommitIndex:
+    def __init__(self, repo_dir, index_path=None):
+        self.repo_dir = repo_dir
+        if index_path is None:
+            common_dir = self.git("rev-parse", "--git-common-dir").strip()
+            index_path = os.path.join(repo_dir, common_dir, index_filename)
+        self.index_path = index_path
+        # Shared with other workers, wait for their writes instead of failing
+        self.db = sqlite3.connect(index_path, timeout=300)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS commits (id INTEGER PRIMARY KEY, hash TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS paths (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+            CREATE TABLE IF NOT EXISTS changes (commit_id INTEGER NOT NULL, path_id INTEGER NOT NULL,
+                                                PRIMARY KEY (commit_id, path_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS changes_by_path ON changes (path_id, commit_id);
+        """)
+        # (bad, goods) -> [(commit, parents)] of rev-list --topo-order, newest first
+        self.ranges = {}
+
+    def close(self):
+        self.db.close()
+
+    def git(self, *args, stdin=None):
+        result = subprocess.run(["git"] + list(args), cwd=self.repo_dir, input=stdin, capture_output=True,
+                                text=True, errors="replace")
+        if result.returncode != 0:
+            raise Exception("git " + " ".join(args[:2]) + " failed: " + result.stderr.strip())
+        return result.stdout
+
+    def commit_ids(self, commits):
+        ids = {}
+        for chunk in chunks(commits):
+            rows = self.db.execute("SELECT hash, id FROM commits WHERE hash IN (" + ",".join("?" * len(chunk)) + ")",
+                                   chunk)
+            ids.update(rows)
+        return ids
+
+    def path_ids(self, paths):
+        ids = {}
+        for chunk in chunks(list(paths)):
+            rows = self.db.execute("SELECT path, id FROM paths WHERE path IN (" + ",".join("?" * len(chunk)) + ")",
+                                   chunk)
+            ids.update(rows)
+        return ids
+
+    # Indexes all given commits which are not indexed yet
+    def ensure(self, commits):
+        indexed = self.commit_ids(commits)
+        missing = [commit for commit in commits if commit not in indexed]
+        if len(missing) == 0:
+            return
+        logging.info("Indexing changed paths of " + str(len(missing)) + " commits")
+        output = self.git("log", "--no-walk=unsorted", "--stdin", "--format=%x00%H", "--name-only", "--no-renames",
+                          stdin="\n".join(missing) + "\n")
+        with self.db:
+            for record in output.split("\0")[1:]:
+                lines = record.split("\n")
+                self.db.execute("INSERT OR IGNORE INTO commits (hash) VALUES (?)", (lines[0],))
+                commit_id = self.db.execute("SELECT id FROM commits WHERE hash = ?", (lines[0],)).fetchone()[0]
+                for path in set(line for line in lines[1:] if line != ""):
+                    self.db.execute("INSERT OR IGNORE INTO paths (path) VALUES (?)", (path,))
+                    self.db.execute("INSERT OR IGNORE INTO changes (commit_id, path_id) "
+                                    "SELECT ?, id FROM paths WHERE path = ?", (commit_id, path))
+
+    def changed_paths(self, commit):
+        self.ensure([commit])
+        rows = self.db.execute("SELECT paths.path FROM changes JOIN commits ON commits.id = changes.commit_id "
+                               "JOIN paths ON paths.id = changes.path_id WHERE commits.hash = ?", (commit,))
+        return [row[0] for row in rows]
+
+    # Commits of the range which changed one of the paths
+    def commits_changing(self, commits, paths):
+        self.ensure(commits)
+        path_ids = list(self.path_ids(paths).values())
+        commit_ids = self.commit_ids(commits)
+        changing_ids = set()
+        for chunk in chunks(path_ids):
+            rows = self.db.execute("SELECT DISTINCT commit_id FROM changes WHERE path_id IN (" +
+                                   ",".join("?" * len(chunk)) + ")", chunk)
+            changing_ids.update(row[0] for row in rows)
+        return set(commit for commit in commits if commit_ids[commit] in changing_ids)
+
+    # bad ^goods[0] ^goods[1] ... like git rev-list --topo-order --parents
+    def range(self, bad, goods):
+        key = (bad, tuple(goods))
+        if key not in self.ranges:
+            output = self.git("rev-list", "--topo-order", "--parents", bad, *["^" + good for good in goods])
+            self.ranges[key] = [(hashes[0], hashes[1:]) for hashes in
+                                (line.split() for line in output.splitlines()) if len(hashes) > 0]
+        return self.ranges[key]
+
+    def count(self, bad, goods, paths=None):
+        commits = [commit for commit, _ in self.range(bad, goods)]
+        if paths is None:
+            return len(commits)
+        return len(self.commits_changing(commits, paths))
+
+    # Output of git rev-list --topo-order --parents bad ^goods -- paths: only commits which changed one of the paths,
+    # parents rewritten to their nearest such ancestors in the range
+    def rev_list(self, bad, goods, paths):
+        commits = self.range(bad, goods)
+        if len(paths) == 0:
+            return "\n".join(" ".join([commit] + parents) for commit, parents in commits)
+        changing = self.commits_changing([commit for commit, _ in commits], paths)
+
+        # nearest changing commits reachable from every commit (itself if it changes one of the paths), parents
+        # outside of the range are kept as boundary like git does
+        nearest = {}
+        lines = []
+        for commit, parents in reversed(commits):
+            rewritten = []
+            for parent in parents:
+                for ancestor in nearest.get(parent, (parent,)):
+                    if ancestor not in rewritten:
+                        rewritten.append(ancestor)
+            if commit in changing:
+                nearest[commit] = (commit,)
+                lines.append(" ".join([commit] + rewritten))
+            else:
+                nearest[commit] = tuple(rewritten)
+        return "\n".join(reversed(lines))
@@ -3,32 +3,47 @@ import logging
 import os
 import shutil
 import subprocess
+import tempfile
+
+from autobisect import blobstore
+from autobisect.statusindex import StatusIndex
 
 workspace_folder = "../workspace"
+# configs and reproducers are linked into the test directories from here
+blob_store = workspace_folder + "/blobs"
 
 def load_reproducers(folder, experiment_name, args, filter_function=lambda _1, _2: True):
     logging.info("Loading reproducers from " + folder + "...")
+    index = StatusIndex(folder)
+    index.sync(experiment_name)
     reproducers = []
-    for reprodir in os.listdir(folder):
+    # only the rows should_test can accept are loaded
+    for reprodir, data, status in index.select(experiment_name, states=test_states(args), ids=args.reproducer):
         full_dir = os.path.join(folder, reprodir)
-        if args.reproducer is not None and reprodir not in args.reproducer:
-            continue
-
-        data = load_data(full_dir)
         if data is None:
+            logging.info("Failed to parse " + os.path.join(full_dir, "status.json"))
             continue
 
-        status = load_status(full_dir, experiment_name)
-
         if should_test(args, status) and filter_function(data, status):
             reproducers.append({
                 "status": status,
                 "data": data,
             })
             write_status(full_dir, experiment_name, status)
+    index.close()
     return reproducers
 
 
+# The retest states should_test accepts, None for all of them
+def test_states(args):
+    if args.force:
+        return None
+    states = ["not_retested", "running"]
+    if args.retry_failed:
+        states += ["failed", "delayed"]
+    return states
+
+
 def load_data(repro_folder):
     data_file_path = os.path.join(repro_folder, "status.json")
     with open(data_file_path, "r") as data_file:
@@ -62,8 +77,14 @@ def write_status_path(path, status):
     status_file_path = os.path.join(path, "status.json")
     os.makedirs(path, exist_ok=True)
 
+    content = json.dumps(status, indent=4)
+    # an unchanged file is not rewritten, its mtime tells the status index that it does not need to parse it again
+    if os.path.isfile(status_file_path):
+        with open(status_file_path, "r") as status_file:
+            if status_file.read() == content:
+                return
     with open(status_file_path, "w+") as status_file:
-        json.dump(status, status_file, indent=4)
+        status_file.write(content)
 
 
 def should_test(args, status):
@@ -87,7 +108,7 @@ def should_test(args, status):
 
 
 def write_vm_config(vm_cfg_file, basedir, crashdir, workdir, kernel_repo, kernel_branch, syzkaller_repository,
-                    syzkaller_branch):
+                    syzkaller_branch, kernel_dir="linux", syzkaller_dir="syzkaller-changing", http_port=56741):
     cfg_template_path = workspace_folder  + "/configs/vm_syz-bisect.cfg"
     with open(cfg_template_path) as cfg_template_file:
         cfg_template = cfg_template_file.readlines()
@@ -102,12 +123,13 @@ def write_vm_config(vm_cfg_file, basedir, crashdir, workdir, kernel_repo, kernel
             #            line = line.replace("REPLACE_SYSCTL", os.path.abspath(args.sysctl))
             #            line = line.replace("REPLACE_CMDLINE", os.path.abspath(args.cmdline))
             line = line.replace("REPLACE_WORKDIR", workdir)
-            line = line.replace("REPLACE_KERNEL_OBJ", os.path.abspath("linux"))
-            line = line.replace("REPLACE_KERNEL_SOURCE", os.path.abspath("linux"))
-            line = line.replace("REPLACE_SYZKALLER", os.path.abspath("syzkaller-changing"))
+            line = line.replace("REPLACE_HTTP", "127.0.0.1:" + str(http_port))
+            line = line.replace("REPLACE_KERNEL_OBJ", os.path.abspath(kernel_dir))
+            line = line.replace("REPLACE_KERNEL_SOURCE", os.path.abspath(kernel_dir))
+            line = line.replace("REPLACE_SYZKALLER", os.path.abspath(syzkaller_dir))
             line = line.replace("REPLACE_KERNEL_CONFIG", os.path.join(basedir, "kernel.config"))
             line = line.replace("REPLACE_KERNEL_BASELINE_CONFIG", os.path.join(basedir, "kernel.baseline_config"))
-            line = line.replace("REPLACE_KERNEL", os.path.join(os.path.abspath("linux"), "arch/x86_64/boot/bzImage"))
+            line = line.replace("REPLACE_KERNEL", os.path.join(os.path.abspath(kernel_dir), "arch/x86_64/boot/bzImage"))
             line = line.replace("REPLACE_USERSPACE", os.path.abspath(workspace_folder  + "/userspace/debian"))
             line = line.replace("REPLACE_IMAGE", os.path.join("image/stretch.img"))
             line = line.replace("REPLACE_KEY", os.path.join("image/stretch.id_rsa"))
@@ -116,32 +138,90 @@ def write_vm_config(vm_cfg_file, basedir, crashdir, workdir, kernel_repo, kernel
 
 
 def setup_workspace_for_bisection(basedir, crashdir, baseline_config, vm_cfg_file, workdir, kernel_repo, kernel_branch,
-                                  syzkaller_repository, syzkaller_branch, datadir):
+                                  syzkaller_repository, syzkaller_branch, datadir, kernel_dir="linux",
+                                  syzkaller_dir="syzkaller-changing", http_port=56741):
     write_vm_config(vm_cfg_file, basedir, crashdir, workdir, kernel_repo, kernel_branch, syzkaller_repository,
-                    syzkaller_branch)
-    # Copy baseline config
+                    syzkaller_branch, kernel_dir, syzkaller_dir, http_port)
+    store = blobstore.get(blob_store)
+    # the configs may be rewritten by the kernel build, they get their own copy. The reproducers are only read.
     if baseline_config:
-        shutil.copyfile(baseline_config, os.path.join(basedir, "kernel.baseline_config"))
+        store.copy(baseline_config, os.path.join(basedir, "kernel.baseline_config"), private=True)
 
     if os.path.isfile(os.path.join(datadir, "kernel.config")):
-        shutil.copyfile(os.path.join(datadir, "kernel.config"), os.path.join(basedir, "kernel.config"))
+        store.copy(os.path.join(datadir, "kernel.config"), os.path.join(basedir, "kernel.config"), private=True)
     else:
         logging.warning("No kernel config at " + os.path.join(datadir, "kernel.config") + "!")
     if os.path.isfile(os.path.join(datadir, "repro.cprog")):
-        shutil.copyfile(os.path.join(datadir, "repro.cprog"), os.path.join(crashdir, "repro.cprog"))
+        store.copy(os.path.join(datadir, "repro.cprog"), os.path.join(crashdir, "repro.cprog"))
     if os.path.isfile(os.path.join(datadir, "repro.prog")):
-        shutil.copyfile(os.path.join(datadir, "repro.prog"), os.path.join(crashdir, "repro.prog"))
+        store.copy(os.path.join(datadir, "repro.prog"), os.path.join(crashdir, "repro.prog"))
     else:
         logging.warning("No reproducer at " + os.path.join(datadir, "repro.prog") + "!")
 
-    # Move reproducers and copy reproducer options
-    shutil.copyfile(workspace_folder  + "configs/repro.opts", os.path.join(crashdir, "repro.opts"))
+    # Link reproducer options
+    store.copy(workspace_folder  + "configs/repro.opts", os.path.join(crashdir, "repro.opts"))
 
-    if subprocess.run(["git", "checkout", "-f", "master"], cwd="syzkaller-changing").returncode != 0:
-        logging.error("Failed to checkout master branch in syzkaller-changing")
-        raise Exception("Failed to checkout master branch in syzkaller-changing")
-    if subprocess.run(["make", "-s"], cwd="syzkaller-changing").returncode != 0:
-        logging.error("Failed to make syzkaller on master")
-        raise Exception("Failed to make syzkaller on master")
+    build_syzkaller(syzkaller_dir)
 
     logging.info("Workspace setup done.")
+
+
+def git_output(directory, *args):
+    result = subprocess.run(["git"] + list(args), cwd=directory, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+# Built syzkaller binaries by commit, shared by all syzkaller directories (workers, probes):
+# syzkaller-bin-cache
+# 	- <commit>
+# 		- bin
+syzkaller_bin_cache = workspace_folder + "/syzkaller-bin-cache"
+built_commit_filename = ".built_commit"
+
+
+# Checks out master in syzkaller_dir and builds it. syz-test-single checks out and builds older syzkaller versions in
+# the same directory, so master is only built once per commit, later its binaries are copied from the cache. Nothing
+# is done if the directory is still clean at the built master commit.
+def build_syzkaller(syzkaller_dir):
+    commit = git_output(syzkaller_dir, "rev-parse", "master")
+    if commit is None:
+        logging.error("Failed to resolve master branch in " + syzkaller_dir)
+        raise Exception("Failed to resolve master branch in " + syzkaller_dir)
+    bin_dir = os.path.join(syzkaller_dir, "bin")
+    built_commit_path = os.path.join(bin_dir, built_commit_filename)
+
+    built_commit = None
+    if os.path.isfile(built_commit_path):
+        with open(built_commit_path, "r") as built_commit_file:
+            built_commit = built_commit_file.read().strip()
+    if built_commit == commit and git_output(syzkaller_dir, "rev-parse", "HEAD") == commit and \
+            git_output(syzkaller_dir, "status", "--porcelain", "--untracked-files=no") == "":
+        logging.info("Syzkaller in " + syzkaller_dir + " is already built at " + commit)
+        return
+
+    if subprocess.run(["git", "checkout", "-f", "master"], cwd=syzkaller_dir).returncode != 0:
+        logging.error("Failed to checkout master branch in " + syzkaller_dir)
+        raise Exception("Failed to checkout master branch in " + syzkaller_dir)
+
+    cached_bin_dir = os.path.join(syzkaller_bin_cache, commit, "bin")
+    if os.path.isdir(cached_bin_dir):
+        logging.info("Using cached syzkaller binaries of " + commit)
+        shutil.rmtree(bin_dir, ignore_errors=True)
+        shutil.copytree(cached_bin_dir, bin_dir, symlinks=True)
+    else:
+        if subprocess.run(["make", "-s"], cwd=syzkaller_dir).returncode != 0:
+            logging.error("Failed to make syzkaller on master")
+            raise Exception("Failed to make syzkaller on master")
+        # Other workers and probes may cache the same commit at the same time, the first one wins
+        os.makedirs(syzkaller_bin_cache, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=commit + ".tmp.", dir=syzkaller_bin_cache)
+        shutil.copytree(bin_dir, os.path.join(tmp_dir, "bin"), symlinks=True)
+        try:
+            os.rename(tmp_dir, os.path.join(syzkaller_bin_cache, commit))
+        except OSError:
+            shutil.rmtree(tmp_dir)
+
+    with open(built_commit_path, "w") as built_commit_file:
+        built_commit_file.write(commit + "\n")
@@ -0,0 +1,115 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+
+from autobisect.crawler import crawl, fetcher
+
+# Benchmarks the parsing of syzbot pages on saved fixtures:
+#
+# 	python3 -m autobisect.crawler.benchmark --record 50 --fixtures crawl-fixtures
+# 	python3 -m autobisect.crawler.benchmark --fixtures crawl-fixtures --output crawl_benchmark.json
+#
+# fixtures
+# 	- fixed.html (the bug table of upstream/fixed)
+# 	- bugs
+# 		- <id>.html (bug page)
+#
+# Every page is parsed like the crawler did before (html.parser over the whole page) and like it does now (the bug
+# table restricted to the list table, bug pages with the fastest available parser).
+
+
+def bug_fixtures(directory):
+    bugs_directory = os.path.join(directory, "bugs")
+    for filename in sorted(os.listdir(bugs_directory)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(bugs_directory, filename), "rb") as f:
+            yield filename[:-len(".html")], f.read()
+
+
+def record(args):
+    http = fetcher.from_args(args)
+    os.makedirs(os.path.join(args.fixtures, "bugs"), exist_ok=True)
+    content = http.get("/upstream/fixed").content
+    with open(os.path.join(args.fixtures, "fixed.html"), "wb") as f:
+        f.write(content)
+    bugs = [bug for bug in crawl.parse_bug_table(content, http) if crawl.should_bisect(bug, args)][:args.record]
+    for bug in bugs:
+        with open(os.path.join(args.fixtures, "bugs", bug["json"]["id"] + ".html"), "wb") as f:
+            f.write(http.get(bug["json"]["link"]).content)
+    logging.info("Recorded " + str(len(bugs)) + " bug pages in " + args.fixtures)
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"min_seconds": min(timings), "median_seconds": statistics.median(timings)}
+
+
+def run_benchmark(directory, repeat, base_url):
+    # the parse functions only resolve links with it, nothing is fetched
+    http = fetcher.Fetcher(base_url)
+    with open(os.path.join(directory, "fixed.html"), "rb") as f:
+        table = f.read()
+    bugs = list(bug_fixtures(directory))
+
+    def parse_pages(features):
+        for bug_id, content in bugs:
+            crawl.parse_bug_page({"json": {"id": bug_id}}, content, http, features)
+
+    stages = {
+        "bug_table_before": lambda: crawl.parse_bug_table(table, http, "html.parser", strain=False),
+        "bug_table_after": lambda: crawl.parse_bug_table(table, http),
+        "bug_pages_before": lambda: parse_pages("html.parser"),
+        "bug_pages_after": lambda: parse_pages(crawl.html_features),
+    }
+    results = {"bugs": len(bugs), "features": crawl.html_features, "stages": {}}
+    for name, function in stages.items():
+        results["stages"][name] = measure(function, repeat)
+        logging.info(name + ": " + str(round(results["stages"][name]["min_seconds"], 4)) + "s")
+    if len(bugs) > 0:
+        for stage in ["bug_pages_before", "bug_pages_after"]:
+            results["stages"][stage]["min_seconds_per_bug"] = results["stages"][stage]["min_seconds"] / len(bugs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parsing of syzbot pages on saved fixtures')
+    parser.add_argument('--fixtures', required=True, help='Directory with the saved pages')
+    parser.add_argument('--record', default=0, type=int, help='Download this many bug pages into the fixtures first')
+    parser.add_argument('--repeat', default=3, type=int, help='Timed repetitions per stage')
+    parser.add_argument('--output', default="crawl_benchmark_results.json", help='JSON file to write the results to')
+    parser.add_argument('--syzbot_url', default="https://syzkaller.appspot.com", help='Base URL of syzbot')
+    parser.add_argument('--requests_per_second', default=5, type=float, help='Rate limit while recording')
+    args = parser.parse_args()
+    args.concurrency = 1
+    args.retries = 5
+
+    logging.getLogger().setLevel(logging.INFO)
+    # the parsers log every bug, only the benchmark progress is of interest here
+    logging.getLogger().addFilter(lambda record: record.pathname == os.path.abspath(__file__))
+
+    if args.record > 0:
+        record(args)
+
+    results = {
+        "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmark": run_benchmark(args.fixtures, args.repeat, args.syzbot_url),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    logging.info("Results written to " + args.output)
+
+
+if __name__ == "__main__":
+    main()
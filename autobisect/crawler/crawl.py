@@ -1,11 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import json
 import os
 import logging
-import subprocess
 import re
 import datetime
+import threading
+
+from autobisect import blobstore, gitservice
+from autobisect.crawler import fetcher
+from autobisect.subjectindex import SubjectIndex
+
+# lxml parses pages much faster than the parser of the standard library, it is optional
+try:
+    import lxml  # noqa: F401
+    html_features = "lxml"
+except ImportError:
+    html_features = "html.parser"
 
 
 # Fetches bugs from syzbot and parses them into a json file
@@ -22,12 +32,13 @@ def start(args):
         logging.error("No reproducer directory specified, exiting...")
         return
 
+    http = fetcher.from_args(args)
+
     logging.info("Fetching bugs from syzbot...")
-    URL = "https://syzkaller.appspot.com/upstream/fixed"
-    page = rate_limited_get(URL)
+    page = http.get("/upstream/fixed")
 
     logging.info("Parsing html...")
-    bugs = parse_bug_table(page.content)
+    bugs = parse_bug_table(page.content, http)
     bugs_bisect_success = [bug for bug in bugs if should_bisect(bug, args)]
 
     logging.info(f"Total bugs: {len(bugs)}")
@@ -48,22 +59,49 @@ def start(args):
     logging.info(f"Total bugs bisect done: {done}")
     logging.info(f"Total bugs bisect failed: {failed}")
     logging.info(f"Total bugs bisect untested: {untested}")
-    
-
-    logging.info("Fetching bisection logs and crashes...")
-    fetch_bisection_logs(bugs_bisect_success)
-
-    bugs_with_bics = fetch_bics(bugs_bisect_success, args)
-    bugs_bic_available = [bug for bug in bugs_with_bics if len(bug["json"]["bics"]) > 0]
-    bugs_bic_not_available = [bug for bug in bugs_with_bics if len(bug["json"]["bics"]) == 0]
-    bugs_young_enough = [bug for bug in bugs_with_bics if is_young_enough(args, bug["json"]["syzkaller-crash"]["syzkaller_commit"])]
-    bugs_too_old = [bug for bug in bugs_with_bics if not is_young_enough(args, bug["json"]["syzkaller-crash"]["syzkaller_commit"])]
-    bugs_bic_available_and_young_enough = [bug for bug in bugs_bic_available if bug in bugs_young_enough]
-    bugs_bic_available_and_too_old = [bug for bug in bugs_bic_available if bug in bugs_too_old]
-    bugs_bic_not_available_and_too_old = [bug for bug in bugs_bic_not_available if bug in bugs_too_old]
-    bugs_bic_not_available_and_young_enough = [bug for bug in bugs_bic_not_available if bug in bugs_young_enough]
-
-    logging.info(f"Total bugs with bics: {len(bugs_with_bics)}")
+
+    no_bics = NoBics(args.reproducer_dir.rstrip("/") + ".crawl-no-bics.jsonl") if args.reproducer_dir else None
+    if args.delta and args.reproducer_dir:
+        bugs_bisect_success = [bug for bug in bugs_bisect_success if is_new_or_changed(bug, args, no_bics)]
+        logging.info(f"New or changed bugs: {len(bugs_bisect_success)}")
+
+    checkpoint = None
+    if not args.dry:
+        checkpoint = Checkpoint(args.checkpoint or args.reproducer_dir.rstrip("/") + ".crawl-checkpoint.jsonl")
+        logging.info(f"Bugs finished by an interrupted crawl: {len(checkpoint.finished)}")
+
+    logging.info("Crawling bugs...")
+    git = gitservice.get(args.linux)
+    # fix commits given by title are looked up by subject, the index only reads commits fetched since the last crawl
+    subjects = SubjectIndex(args.linux)
+    subjects.update()
+    store = blobstore.get(args.blob_store)
+    todo = [bug for bug in bugs_bisect_success if checkpoint is None or bug["json"]["id"] not in checkpoint.finished]
+    records = http.map(lambda bug: crawl_bug(bug, args, http, git, subjects, store, checkpoint, no_bics), todo,
+                       progress=print_progress)
+    print()
+    subjects.close()
+
+    failed_bugs = len([record for record in records if record is None])
+    if failed_bugs > 0:
+        logging.error(f"Failed bugs (retried by the next crawl): {failed_bugs}")
+    records = [record for record in records if record is not None]
+    if checkpoint is not None:
+        records += checkpoint.finished.values()
+        # the run got through all bugs, failed ones are retried by the next crawl like all others
+        checkpoint.remove()
+
+    bugs_bic_available = [record for record in records if record["bics"] > 0]
+    bugs_bic_not_available = [record for record in records if record["bics"] == 0]
+    young_enough = are_young_enough(args, [record["syzkaller_commit"] for record in records])
+    bugs_young_enough = [record for record in records if young_enough[record["syzkaller_commit"]]]
+    bugs_too_old = [record for record in records if not young_enough[record["syzkaller_commit"]]]
+    bugs_bic_available_and_young_enough = [record for record in bugs_bic_available if record in bugs_young_enough]
+    bugs_bic_available_and_too_old = [record for record in bugs_bic_available if record in bugs_too_old]
+    bugs_bic_not_available_and_too_old = [record for record in bugs_bic_not_available if record in bugs_too_old]
+    bugs_bic_not_available_and_young_enough = [record for record in bugs_bic_not_available if record in bugs_young_enough]
+
+    logging.info(f"Total bugs with bics: {len(records)}")
     logging.info(f"Total bugs with bics available: {len(bugs_bic_available)}")
     logging.info(f"Total bugs with bics not available: {len(bugs_bic_not_available)}")
 
@@ -71,25 +109,101 @@ def start(args):
     logging.info(f"Total bugs with bics available and too old: {len(bugs_bic_available_and_too_old)}")
     logging.info(f"Total bugs with bics not available and too old: {len(bugs_bic_not_available_and_too_old)}")
     logging.info(f"Total bugs with bics not available and young enough: {len(bugs_bic_not_available_and_young_enough)}")
-    exit()
-    logging.info("Determining bisection parameters...")
-    determine_bisection_parameters(bugs_bic_available, args)
-
     if args.dry:
-        logging.info("Dry run, not writing bugs to directory...")
-        return
-
-    logging.info("Writing bugs to directory...")
-    write_bugs_to_dir(bugs_bic_available, args)
-
-
-def rate_limited_get(url):
-    # time.sleep(0.05)
-    return requests.get(url)
-
-
-def parse_bug_table(content):
-    soup = BeautifulSoup(content, "html.parser")
+        logging.info("Dry run, no bugs were written to the directory")
+
+
+# Bugs which are completely crawled (written to the reproducer directory, or found to have no bics), one JSON record
+# per line. A crawl which was interrupted skips them when it is started again, the file is removed once a crawl
+# went through all bugs (even if some failed, they would otherwise keep all others from being crawled again).
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.finished = {}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted write
+                        continue
+                    self.finished[record["id"]] = record
+
+    def add(self, record):
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+# Bugs which were crawled without bics, with the columns of their row in the bug table (delta_fields). They are
+# never written to the reproducer directory, so this is what the delta mode compares them with. One JSON record per
+# line, the last record of a bug counts.
+class NoBics:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.bugs = {}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted write
+                        continue
+                    self.bugs[record["id"]] = record
+
+    def add(self, bug):
+        record = {field: bug["json"][field] for field in ["id"] + delta_fields}
+        with self.lock:
+            self.bugs[record["id"]] = record
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+# Runs all stages of the crawl for one bug: details, bics, bisection parameters, writing it. Returns a small record
+# of the bug (what the summary needs) or None if it failed. The downloaded files are dropped once the bug is written,
+# so only the bugs in flight are held in memory.
+def crawl_bug(bug, args, http, git, subjects, store, checkpoint, no_bics):
+    try:
+        fetch_bug_details(bug, http)
+        fetch_bics(bug, git, subjects)
+        if len(bug["json"]["bics"]) > 0:
+            determine_bisection_parameters(bug, git, http, store)
+            if not args.dry:
+                write_bug_to_dir(bug, args, store)
+        elif not args.dry and no_bics is not None and bug["missing-fix-commits"] == 0:
+            # with fix commits missing in the kernel repository, a later crawl may still find bics
+            no_bics.add(bug)
+    except Exception as e:
+        logging.error(f"Bug {bug['json']['id']} failed: {e}")
+        return None
+    for key in ["blobs", "bisect-log", "missing-fix-commits"]:
+        bug.pop(key, None)
+    record = {
+        "id": bug["json"]["id"],
+        "bics": len(bug["json"]["bics"]),
+        "syzkaller_commit": bug["json"]["syzkaller-crash"]["syzkaller_commit"],
+    }
+    if checkpoint is not None:
+        checkpoint.add(record)
+    return record
+
+
+def print_progress(i, num_bugs):
+    print("[" + "=" * int(i / num_bugs * 20) + " " * (20 - int(i / num_bugs * 20)) + "] " + str(i) + "/" + str(
+        num_bugs), end="\r")
+
+
+# strain=False parses the whole page (only used to compare with in the benchmark)
+def parse_bug_table(content, http, features=html_features, strain=True):
+    soup = BeautifulSoup(content, features, parse_only=SoupStrainer("table", class_="list_table") if strain else None)
 
     results = soup.find(class_="list_table")
     job_elems = results.find_all("tr")
@@ -107,7 +221,7 @@ def parse_bug_table(content):
         bug["json"] = {}
         bug_json = bug["json"]
         bug_json["title"] = job_elem.find("td", class_="title").text.strip()
-        bug_json["link"] = "https://syzkaller.appspot.com" + job_elem.find("td", class_="title").find("a")["href"]
+        bug_json["link"] = http.url(job_elem.find("td", class_="title").find("a")["href"])
         bug_json['id'] = bug_json["link"].split("=")[-1]
         bug_json["reproducer"] = stats[0].text.strip()
         bug_json["cause-bisect"] = bisect_status[0].text.strip()
@@ -133,176 +247,198 @@ def should_bisect(bug, args):
     return True
 
 
-def fetch_bisection_logs(bugs_bisect_success):
-    num_bugs = len(bugs_bisect_success)
-    i = 0
-    for bug in bugs_bisect_success:
-        bug_html = BeautifulSoup(rate_limited_get(bug["json"]["link"]).content, "html.parser")
-        link = bug_html.find("a", string="bisect log")
-        if link:
-            bug["bisect-log"] = rate_limited_get("https://syzkaller.appspot.com" + link["href"]).text
+# Columns of the bug table which do not change over time ("last", "reported" and "closed" are relative ages)
+delta_fields = ["title", "reproducer", "cause-bisect", "fix-bisect", "patched", "patch"]
+
+
+# Whether the bug is neither in the reproducer directory nor known to have no bics yet, or its row in the bug table
+# changed since it was crawled
+def is_new_or_changed(bug, args, no_bics):
+    status_path = os.path.join(args.reproducer_dir, bug["json"]["id"], "status.json")
+    if os.path.isfile(status_path):
+        with open(status_path, "r") as f:
+            status = json.load(f)
+    elif bug["json"]["id"] in no_bics.bugs:
+        status = no_bics.bugs[bug["json"]["id"]]
+    else:
+        return True
+    return any(status.get(field) != bug["json"][field] for field in delta_fields)
+
+
+def fetch_bug_details(bug, http):
+    link = parse_bug_page(bug, http.get(bug["json"]["link"]).content, http)
+    if link:
+        bug["bisect-log"] = http.get(link, immutable=True).text
+    else:
+        logging.warning(f"Bug {bug['json']['id']} has no bisect log")
+
+
+# Parses the fix commits, the fix bisection and the crashes of the bug page into the bug and returns the link of the
+# bisect log or None. The JSON version of the page (&json=1) has no crash times, managers, kernel names or bisect log,
+# so the HTML page is needed anyway and everything is taken from it with a single request.
+def parse_bug_page(bug, content, http, features=html_features):
+    # the whole page is parsed, the fix commits are found by their siblings
+    bug_html = BeautifulSoup(content, features)
+    bug["json"]["fix-commits"] = parse_fix_commits(bug_html)
+
+    link = bug_html.find("a", string="bisect log")
+
+    if bug_html.find("b", string="Fix bisection: fixed by"):
+        fix_bisection_commit_text = bug_html.find("b", string="Fix bisection: fixed by").find_next("span",
+                                                                                                   class_="mono").text
+
+        # multiline
+        regex = re.compile(r"commit ([0-9a-f]{40})", re.MULTILINE)
+        fix_bisection_commit_match = re.search(regex, fix_bisection_commit_text)
+
+        if fix_bisection_commit_match:
+            fix_bisection_commit = fix_bisection_commit_match.group(1)
+            bug["json"]["fix-bisection-commit"] = fix_bisection_commit
+            if fix_bisection_commit not in bug["json"]["fix-commits"]:
+                logging.debug(f"Bug {bug['json']['id']} fix commits do not contain fix bisection commit, " + \
+                              f"fix commits: {bug['json']['fix-commits']}, fix bisection commit: {fix_bisection_commit}")
         else:
-            logging.warning(f"Bug {bug['json']['id']} has no bisect log")
-
-        fix_commit_text = bug_html.find("b", string="Fix commit:")
-        # find all <span class="mono"> elements between <b>"Fix commit:"</b> and <b>"Patched on:"</b> and put them in a list
-        bug["json"]["fix-commits"] = []
-        for span in fix_commit_text.find_next_siblings("span", class_="mono"):
-            if span.find("a"):
-                bug["json"]["fix-commits"].append(span.find("a").get("href").split("=")[-1])
-            else:
-                # this is the title of the commit instead of a link, the commit can probably not be checked out
-                text_regex = re.compile(r"[\n\t\s]*(.*)[\n\t\s]*")
-                text = re.search(text_regex, span.text).group(1)
-                # logging.info(f"Commit title trimmed: {text}")
-                bug["json"]["fix-commits"].append(text)
-            if span.find_next_sibling().name != "span":
+            logging.warning(f"Bug {bug['json']['id']} no commit in " + fix_bisection_commit_text)
+
+    crash_table = None
+    tables = bug_html.find_all("table", class_="list_table")
+    for table in tables:
+        if table.find("caption"):
+            if table.find("caption").text.startswith("Crashes"):
+                crash_table = table
                 break
 
-        if bug_html.find("b", string="Fix bisection: fixed by"):
-            fix_bisection_commit_text = bug_html.find("b", string="Fix bisection: fixed by").find_next("span",
-                                                                                                       class_="mono").text
+    if crash_table is None:
+        raise Exception(f"Bug {bug['json']['id']} has no crash table")
 
-            # multiline
-            regex = re.compile(r"commit ([0-9a-f]{40})", re.MULTILINE)
-            fix_bisection_commit_match = re.search(regex, fix_bisection_commit_text)
+    syz_reproducer_link = bug_html.find("a", string="syz").get("href")
+    links = crash_table.find_all("a", href=syz_reproducer_link)
+    if len(links) != 1:
+        raise Exception(f"Exception")
+    tr_entry = links[0].parent.parent
+    bug["json"]["syzkaller-crash"] = extract_json_from_tr(tr_entry, http)
 
-            if fix_bisection_commit_match:
-                fix_bisection_commit = fix_bisection_commit_match.group(1)
-                bug["json"]["fix-bisection-commit"] = fix_bisection_commit
-                if fix_bisection_commit not in bug["json"]["fix-commits"]:
-                    logging.debug(f"Bug {bug['json']['id']} fix commits do not contain fix bisection commit, " + \
-                                  f"fix commits: {bug['json']['fix-commits']}, fix bisection commit: {fix_bisection_commit}")
-            else:
-                logging.warning(f"Bug {bug['json']['id']} no commit in " + fix_bisection_commit_text)
-
-        crash_table = None
-        tables = bug_html.find_all("table", class_="list_table")
-        for table in tables:
-            if table.find("caption"):
-                if table.find("caption").text.startswith("Crashes"):
-                    crash_table = table
-                    break
-
-        if crash_table is None:
-            raise Exception(f"Bug {bug['json']['id']} has no crash table")
-
-        syz_reproducer_link = bug_html.find("a", string="syz").get("href")
-        links = crash_table.find_all("a", href=syz_reproducer_link)
-        if len(links) != 1:
-            raise Exception(f"Exception")
-        tr_entry = links[0].parent.parent
-        bug["json"]["syzkaller-crash"] = extract_json_from_tr(tr_entry)
-
-        bug["json"]["crashes"] = []
-        for crash in crash_table.find_all("tr"):
-            if crash.find("th"):
-                continue
-
-            crash_json = extract_json_from_tr(crash)
-
-            # Ignore crashes without reproducers
-            if "reproducer_link" in crash_json or "c-reproducer_link" in crash_json:
-                bug["json"]["crashes"].append(crash_json)
-        if len(bug["json"]["crashes"]) == 0:
-            raise Exception(f"Bug {bug['json']['id']} has no crashes")
-
-        i += 1
-        print("[" + "=" * int(i / num_bugs * 20) + " " * (20 - int(i / num_bugs * 20)) + "] " + str(i) + "/" + str(
-            num_bugs), end="\r")
-    print()
+    bug["json"]["crashes"] = []
+    for crash in crash_table.find_all("tr"):
+        if crash.find("th"):
+            continue
 
+        crash_json = extract_json_from_tr(crash, http)
 
-def fetch_bics(bugs, args):
+        # Ignore crashes without reproducers
+        if "reproducer_link" in crash_json or "c-reproducer_link" in crash_json:
+            bug["json"]["crashes"].append(crash_json)
+    if len(bug["json"]["crashes"]) == 0:
+        raise Exception(f"Bug {bug['json']['id']} has no crashes")
+    return link["href"] if link else None
+
+
+def parse_fix_commits(bug_html):
+    fix_commit_text = bug_html.find("b", string="Fix commit:")
+    # find all <span class="mono"> elements between <b>"Fix commit:"</b> and <b>"Patched on:"</b> and put them in a list
+    fix_commits = []
+    for span in fix_commit_text.find_next_siblings("span", class_="mono"):
+        if span.find("a"):
+            fix_commits.append(span.find("a").get("href").split("=")[-1])
+        else:
+            # this is the title of the commit instead of a link, the commit can probably not be checked out
+            text_regex = re.compile(r"[\n\t\s]*(.*)[\n\t\s]*")
+            text = re.search(text_regex, span.text).group(1)
+            # logging.info(f"Commit title trimmed: {text}")
+            fix_commits.append(text)
+        if span.find_next_sibling().name != "span":
+            break
+    return fix_commits
+
+
+def fetch_bics(bug, git, subjects):
     bics = []
-    for bug in bugs:
-        for commit in bug["json"]["fix-commits"]:
-            is_commit = re.match(r"^[0-9a-f]{40}$", commit)
-            if is_commit:
-                cmd = f"git -C '{args.linux}' log -1 {commit}"
-                commit_message = os.popen(cmd).read()
-            else:
-                commit = commit.replace("\"", "\\\"")
-                cmd = f"git -C '{args.linux}' log -1 --grep=\"{commit}\""
-                commit_message = os.popen(cmd).read()
-            if "Fixes: " in commit_message:
-                bic = commit_message.split("Fixes: ")[1].split(" ")[0][0:12]
-                bics.append(bic)
-        bug["json"]["bics"] = bics
-        bics = []
-    return bugs
+    missing = 0
+    for commit in bug["json"]["fix-commits"]:
+        is_commit = re.match(r"^[0-9a-f]{40}$", commit)
+        if is_commit:
+            commit_message = git.commit_message(commit) or ""
+        else:
+            # a title which is no subject in the index is not in the tree (yet), it is counted as missing
+            fix_commit = subjects.lookup(commit)
+            commit_message = git.commit_message(fix_commit) if fix_commit is not None else ""
+        if commit_message == "":
+            missing += 1
+        if "Fixes: " in commit_message:
+            bic = commit_message.split("Fixes: ")[1].split(" ")[0][0:12]
+            bics.append(bic)
+    bug["json"]["bics"] = bics
+    bug["missing-fix-commits"] = missing
 
 
 REQUIRED_COMMIT = "3bcdec13657598f6a6163c7ddecff58c2d3a2a71"
 
 
 def is_young_enough(args, syzkaller_commit):
-    cmd = f"git -C \"{args.syzkaller_dir}\" merge-base --is-ancestor 3bcdec13657598f6a6163c7ddecff58c2d3a2a71 \"{syzkaller_commit}\""
-    logging.info("$" + cmd)
-    return os.system(cmd) == 0
-
-
-def determine_bisection_parameters(bugs_bisect_success, args):
-    num_bugs = len(bugs_bisect_success)
-    i = 0
-    for bug in bugs_bisect_success:
-        if bug["json"]["syzkaller-crash"]["kernel"] == "upstream":
-            logging.info(f"[{bug['json']['id']}]: upstream.")
-            resolve_links(bug, bug["json"]["syzkaller-crash"])
-            bug["json"]["similarity"] = 100
+    return are_young_enough(args, [syzkaller_commit])[syzkaller_commit]
+
+
+def are_young_enough(args, syzkaller_commits):
+    return gitservice.get(args.syzkaller_dir).contains_many(REQUIRED_COMMIT, syzkaller_commits)
+
+
+def determine_bisection_parameters(bug, git, http, store):
+    # existence of all crashed kernel commits in one go, later checks are answered from memory
+    git.exists_many([crash["kernel_commit"] for crash in bug["json"]["crashes"] + [bug["json"]["syzkaller-crash"]]
+                     if "kernel_commit" in crash])
+    if bug["json"]["syzkaller-crash"]["kernel"] == "upstream":
+        logging.info(f"[{bug['json']['id']}]: upstream.")
+        resolve_links(bug, bug["json"]["syzkaller-crash"], http, store)
+        bug["json"]["similarity"] = 100
+    else:
+        # test if the commit exists on linux-next with git
+        # if it does, use that commit
+
+        if bug["json"]["syzkaller-crash"]["kernel"] == "linux-next":
+            logging.info(
+                f"[{bug['json']['id']}]: linux-next, checking if commit exists on local linux-next repository...")
+            commit = bug["json"]["syzkaller-crash"]["kernel_commit"]
+            if git.exists(commit):
+                print("Commit exists, using it")
+                resolve_links(bug, bug["json"]["syzkaller-crash"], http, store)
+                bug["json"]["similarity"] = 100
+                return
+            logging.info("Commit does not exist, using most-similar commit")
         else:
-            # test if the commit exists on linux-next with git
-            # if it does, use that commit
-
-            if bug["json"]["syzkaller-crash"]["kernel"] == "linux-next":
-                logging.info(
-                    f"[{bug['json']['id']}]: linux-next, checking if commit exists on local linux-next repository...")
-                commit = bug["json"]["syzkaller-crash"]["kernel_commit"]
-                if subprocess.run(["git", "cat-file", "-e", commit], cwd=args.linux).returncode == 0:
-                    print("Commit exists, using it")
-                    resolve_links(bug, bug["json"]["syzkaller-crash"])
-                    bug["json"]["similarity"] = 100
-                    continue
-                logging.info("Commit does not exist, using most-similar commit")
-            else:
-                logging.info(
-                    f"[{bug['json']['id']}]: {bug['json']['syzkaller-crash']['kernel']}, using most-similar commit")
-
-            best_crash = 0
-            best_crash_score = -1
-            for i, crash in enumerate(bug["json"]["crashes"]):
-                similarity = 0
-
-                if crash["kernel_commit"] == bug["json"]["syzkaller-crash"]["kernel_commit"]:
-                    similarity += 40
-                if crash["syzkaller_commit"] == bug["json"]["syzkaller-crash"]["syzkaller_commit"]:
-                    similarity += 20
-                if crash["kernel"] == "linux-next":
-                    commit = crash["kernel_commit"]
-                    if subprocess.run(["git", "cat-file", "-e", commit], cwd=args.linux).returncode == 0:
-                        if crash["kernel"] == bug["json"]["syzkaller-crash"]["kernel"]:
-                            similarity += 30
-                    else:
-                        logging.info(
-                            f"[{bug['json']['id']}]: {crash['kernel_commit']} does not exist on local linux-next repository")
-                        continue
-                elif crash["kernel"] == "upstream":
+            logging.info(
+                f"[{bug['json']['id']}]: {bug['json']['syzkaller-crash']['kernel']}, using most-similar commit")
+
+        best_crash = 0
+        best_crash_score = -1
+        for i, crash in enumerate(bug["json"]["crashes"]):
+            similarity = 0
+
+            if crash["kernel_commit"] == bug["json"]["syzkaller-crash"]["kernel_commit"]:
+                similarity += 40
+            if crash["syzkaller_commit"] == bug["json"]["syzkaller-crash"]["syzkaller_commit"]:
+                similarity += 20
+            if crash["kernel"] == "linux-next":
+                commit = crash["kernel_commit"]
+                if git.exists(commit):
                     if crash["kernel"] == bug["json"]["syzkaller-crash"]["kernel"]:
                         similarity += 30
+                else:
+                    logging.info(
+                        f"[{bug['json']['id']}]: {crash['kernel_commit']} does not exist on local linux-next repository")
+                    continue
+            elif crash["kernel"] == "upstream":
+                if crash["kernel"] == bug["json"]["syzkaller-crash"]["kernel"]:
+                    similarity += 30
 
-                if similarity > best_crash_score:
-                    best_crash_score = similarity
-                    best_crash = i
-            logging.info(f"Best score: {best_crash_score}")
-            bug["json"]["similarity"] = best_crash_score
-            resolve_links(bug, bug["json"]["crashes"][best_crash])
-        i += 1
-        print("[" + "=" * int(i / num_bugs * 20) + " " * (20 - int(i / num_bugs * 20)) + "] " + str(i) + "/" + str(
-            num_bugs), end="\r")
-    print()
+            if similarity > best_crash_score:
+                best_crash_score = similarity
+                best_crash = i
+        logging.info(f"Best score: {best_crash_score}")
+        bug["json"]["similarity"] = best_crash_score
+        resolve_links(bug, bug["json"]["crashes"][best_crash], http, store)
 
 
-def extract_json_from_tr(crash):
+def extract_json_from_tr(crash, http):
     crash_json = {}
     for i, column in enumerate(crash.find_all("td")):
         if i == 0:
@@ -324,75 +460,40 @@ def extract_json_from_tr(crash):
             else:
                 logging.warning(f"Column {column.text} has no syzkaller link")
         elif i == 5 and column.find("a"):
-            crash_json["config_link"] = "https://syzkaller.appspot.com" + column.find("a")["href"]
+            crash_json["config_link"] = http.url(column.find("a")["href"])
         elif i == 8 and column.find("a"):
-            crash_json["reproducer_link"] = "https://syzkaller.appspot.com" + column.find("a")["href"]
+            crash_json["reproducer_link"] = http.url(column.find("a")["href"])
         elif i == 9 and column.find("a"):
-            crash_json["c-reproducer_link"] = "https://syzkaller.appspot.com" + column.find("a")["href"]
+            crash_json["c-reproducer_link"] = http.url(column.find("a")["href"])
     return crash_json
 
 
-def resolve_links(bug, crash):
+def resolve_links(bug, crash, http, store):
     bug["json"]["kernel-source-commit"] = crash["kernel_commit"]
     bug["json"]["syzkaller-commit"] = crash["syzkaller_commit"]
-    bug["reproducer"] = rate_limited_get(crash["reproducer_link"]).text
+    # text resources are addressed by the id of their content, configs shared by many bugs are only downloaded once
+    bug["blobs"] = {"repro.prog": store.fetch(http, crash["reproducer_link"])}
     if "c-reproducer_link" in crash:
-        bug["c-reproducer"] = rate_limited_get(crash["c-reproducer_link"]).text
-    bug["kernel-config"] = rate_limited_get(crash["config_link"]).text
-
-
-def write_bugs_to_dir(bugs_bisect_success, args):
-    num_bugs = len(bugs_bisect_success)
-    i = 0
-    for bug in bugs_bisect_success:
-        dir = args.reproducer_dir + f"/{bug['json']['id']}"
-        os.makedirs(dir + "/bisection/crashes", exist_ok=True)
-        with open(dir + "/status.json", "w") as f:
-            json.dump(bug["json"], f, indent=4)
-        if "reproducer" in bug:
-            with open(dir + "/repro.prog", "w") as f:
-                f.write(bug["reproducer"])
-        else:
-            logging.warning(f"Bug {bug['json']['id']} has no reproducer")
-        if "c-reproducer" in bug:
-            with open(dir + "/repro.cprog", "w") as f:
-                f.write(bug["c-reproducer"])
-        if "kernel-config" in bug:
-            with open(dir + "/kernel.config", "w") as f:
-                f.write(bug["kernel-config"])
-        else:
-            logging.warning(f"Bug {bug['json']['id']} has no kernel config")
-        if "bisect-log" in bug:
-            with open(dir + "/bisection/syz-bisect.log", "w") as f:
-                f.write(bug["bisect-log"])
-        else:
-            logging.warning(f"Bug {bug['json']['id']} has no bisect log")
-        i += 1
-        print("[" + "=" * int(i / num_bugs * 20) + " " * (20 - int(i / num_bugs * 20)) + "] " + str(i) + "/" + str(
-            num_bugs), end="\r")
-
-# Can be removed?
-# logging.info("Fetching bug data...")
-# for bug in bugs_bisect_success:
-#     bug["json"]["data"] = rate_limited_get(bug["json"]["link"] + "&json=1").json()
-
-# logging.info("Fetching bug reproducers and config...")
-# for bug in bugs_bisect_success:
-#     if "syz-reproducer" in bug["json"]["data"]["crashes"][0]:
-#         bug["reproducer"] = rate_limited_get("https://syzkaller.appspot.com" + bug["json"]["data"]["crashes"][0]["syz-reproducer"]).text
-#     else:
-#         logging.warning(f"Bug {bug['json']['id']} has no syz-reproducer")
-#     if "c-reproducer" in bug["json"]["data"]["crashes"][0]:
-#         bug["c-reproducer"] = rate_limited_get("https://syzkaller.appspot.com" + bug["json"]["data"]["crashes"][0]["c-reproducer"]).text
-#     if "kernel-config" in bug["json"]["data"]["crashes"][0]:
-#         bug["kernel-config"] = rate_limited_get("https://syzkaller.appspot.com" + bug["json"]["data"]["crashes"][0]["kernel-config"]).text
-#     else:
-#         logging.warning(f"Bug {bug['json']['id']} has no kernel config")
-#     if bug["json"]["data"]["crashes"][0]["kernel-source-commit"]:
-#         bug["json"]["kernel-source-commit"] = bug["json"]["data"]["crashes"][0]["kernel-source-commit"]
-#     else:
-#         logging.info(f"Bug {bug['json']['id']} has no kernel source commit")
-#     if bug["json"]["data"]["crashes"][0]["syzkaller-commit"]:
-#         bug["json"]["syzkaller-commit"] = bug["json"]["data"]["crashes"][0]["syzkaller-commit"]
-#     else:
-#         logging.warning(f"Bug {bug['json']['id']} has no syzkaller commit")
+        bug["blobs"]["repro.cprog"] = store.fetch(http, crash["c-reproducer_link"])
+    bug["blobs"]["kernel.config"] = store.fetch(http, crash["config_link"])
+
+
+# status.json is written last, a bug which was interrupted while writing is not loaded as a reproducer
+def write_bug_to_dir(bug, args, store):
+    dir = args.reproducer_dir + f"/{bug['json']['id']}"
+    os.makedirs(dir + "/bisection/crashes", exist_ok=True)
+    blobs = bug.get("blobs", {})
+    for filename, digest in blobs.items():
+        # files of the reproducer directory may be edited by hand
+        store.link(digest, os.path.join(dir, filename), private=True)
+    if "repro.prog" not in blobs:
+        logging.warning(f"Bug {bug['json']['id']} has no reproducer")
+    if "kernel.config" not in blobs:
+        logging.warning(f"Bug {bug['json']['id']} has no kernel config")
+    if "bisect-log" in bug:
+        with open(dir + "/bisection/syz-bisect.log", "w") as f:
+            f.write(bug["bisect-log"])
+    else:
+        logging.warning(f"Bug {bug['json']['id']} has no bisect log")
+    with open(dir + "/status.json", "w") as f:
+        json.dump(bug["json"], f, indent=4)
@@ -0,0 +1,139 @@
+import email.utils
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from autobisect.crawler import httpcache
+
+# Concurrent HTTP fetcher of the crawler. All requests share one requests.Session (keep-alive connections, one pool
+# per host sized to the concurrency) and one token bucket which limits the global request rate:
+#
+# 	fetcher = Fetcher(args.syzbot_url, rate=5, concurrency=8)
+# 	page = fetcher.get("/upstream/fixed")
+# 	fetcher.map(fetch_bug, bugs)
+#
+# Paths are resolved against the base URL, so the crawler can be pointed at a local stand-in of syzbot. Responses
+# with 429 or 5xx are retried with exponential backoff (or after Retry-After if the server sends it). With an
+# HttpCache, responses are stored on disk and revalidated with conditional requests.
+
+retry_status = [429, 500, 502, 503, 504]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Blocks until a token is available
+    def take(self):
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            # the token is already taken, others wait behind it
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def retry_after(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    date = email.utils.parsedate_to_datetime(value)
+    return max(0, date.timestamp() - time.time()) if date is not None else None
+
+
+class Fetcher:
+    def __init__(self, base_url, rate=5, concurrency=8, retries=5, backoff=1, timeout=60, cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst=max(1, concurrency))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    # Absolute URL of a path of syzbot, absolute URLs are returned unchanged
+    def url(self, path):
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return self.base_url + "/" + path.lstrip("/")
+
+    # immutable: the resource never changes, a cached response is used without revalidating it
+    def get(self, path, immutable=False):
+        url = self.url(path)
+        cached = self.cache.load(url) if self.cache is not None else None
+        if cached is None:
+            response = self.request(url, {})
+        elif immutable:
+            return cached
+        else:
+            response = self.request(url, self.cache.conditional_headers(cached))
+            if response.status_code == 304:
+                return cached
+        if self.cache is not None:
+            self.cache.store(url, response)
+        return response
+
+    def request(self, url, headers):
+        for attempt in range(self.retries + 1):
+            self.bucket.take()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logging.warning("Fetching " + url + " failed (" + str(e) + "), retrying")
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code not in retry_status or attempt == self.retries:
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = self.backoff * 2 ** attempt
+            logging.warning("Fetching " + url + " returned " + str(response.status_code) + ", retrying in " +
+                            str(delay) + "s")
+            time.sleep(delay)
+        return response
+
+    # Calls function for all items on concurrency threads and returns the results in the order of the items,
+    # progress(done, total) is called on the calling thread after every finished item
+    def map(self, function, items, progress=None):
+        items = list(items)
+        results = [None] * len(items)
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        try:
+            futures = {executor.submit(function, item): i for i, item in enumerate(items)}
+            for done, future in enumerate(as_completed(futures)):
+                results[futures[future]] = future.result()
+                if progress is not None:
+                    progress(done + 1, len(items))
+        finally:
+            # on an error or Ctrl+C only the items in flight are finished
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+
+def from_args(args):
+    return Fetcher(args.syzbot_url, rate=args.requests_per_second, concurrency=args.concurrency,
+                   retries=args.retries, cache=httpcache.from_args(args))
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import threading
+
+import requests
+
+# On-disk cache of syzbot responses:
+#
+# cache
+# 	- <key[:2]>
+# 		- <key>.json (url, status, headers incl. ETag and Last-Modified)
+# 		- <key>.body
+#
+# with key = sha256 of the URL. Cached responses are revalidated with a conditional GET (If-None-Match,
+# If-Modified-Since); a 304 is answered from the cache. Immutable resources (reproducers, configs and logs are
+# addressed by their content id) are returned without asking syzbot at all.
+
+validators = {"ETag": "If-None-Match", "Last-Modified": "If-Modified-Since"}
+
+
+class HttpCache:
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = os.path.join(self.directory, key[:2])
+        return os.path.join(directory, key + ".json"), os.path.join(directory, key + ".body")
+
+    # Returns the cached response of url or None
+    def load(self, url):
+        meta_path, body_path = self.paths(url)
+        if not os.path.isfile(meta_path) or not os.path.isfile(body_path):
+            return None
+        with open(meta_path, "r") as meta_file:
+            meta = json.load(meta_file)
+        with open(body_path, "rb") as body_file:
+            content = body_file.read()
+        response = requests.Response()
+        response.url = url
+        response.status_code = meta["status"]
+        response.headers.update(meta["headers"])
+        response.encoding = meta.get("encoding")
+        response._content = content
+        return response
+
+    def store(self, url, response):
+        if response.status_code != 200:
+            return
+        meta_path, body_path = self.paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        suffix = ".tmp." + str(os.getpid()) + "." + str(threading.get_ident())
+        with open(body_path + suffix, "wb") as body_file:
+            body_file.write(response.content)
+        with open(meta_path + suffix, "w") as meta_file:
+            json.dump({"url": url, "status": response.status_code, "encoding": response.encoding,
+                       "headers": {name: response.headers[name] for name in ["Content-Type"] + list(validators)
+                                   if name in response.headers}}, meta_file)
+        # the body first, so that metadata always points to a complete body
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+
+    # Headers for a conditional GET of the cached response
+    def conditional_headers(self, cached):
+        return {header: cached.headers[name] for name, header in validators.items() if name in cached.headers}
+
+
+def from_args(args):
+    if getattr(args, "http_cache", None) is None:
+        return None
+    return HttpCache(args.http_cache)
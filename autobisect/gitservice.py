@@ -0,0 +1,140 @@
+import os
+import subprocess
+import threading
+
+# Shared access to a git repository. Object lookups go through two long running git cat-file processes (one for
+# existence and hashes, one for contents) instead of a new git process per question, and answers are memoized:
+#
+# 	git = gitservice.get(args.linux)
+# 	git.rev_parse("v5.10")
+# 	git.exists_many(commits)
+# 	git.is_ancestor(commit, other)
+#
+# Bulk methods answer many questions with a single round trip or git call. A service is shared by all threads of a
+# process, its methods are serialized with a lock.
+
+services = {}
+services_lock = threading.Lock()
+
+
+def get(repo_dir):
+    key = os.path.realpath(repo_dir)
+    with services_lock:
+        if key not in services:
+            services[key] = GitService(repo_dir)
+        return services[key]
+
+
+class GitService:
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+        self.lock = threading.RLock()
+        self.batch_check = None
+        self.batch = None
+        # revision -> hash of the commit or None
+        self.commits = {}
+        self.messages = {}
+        # (ancestor, commit) -> bool
+        self.ancestry = {}
+
+    def close(self):
+        with self.lock:
+            for process in [self.batch_check, self.batch]:
+                if process is not None:
+                    process.stdin.close()
+                    process.wait()
+            self.batch_check = None
+            self.batch = None
+
+    def run(self, *args, stdin=None, check=True):
+        result = subprocess.run(["git"] + list(args), cwd=self.repo_dir, input=stdin, capture_output=True, text=True,
+                                errors="replace")
+        if check and result.returncode != 0:
+            raise Exception("git " + " ".join(args[:2]) + " failed: " + result.stderr.strip())
+        return result
+
+    def start(self, option):
+        return subprocess.Popen(["git", "cat-file", option], cwd=self.repo_dir, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    # cat-file --batch-check for all revisions in one round trip, returns hash of the commit or None per revision
+    def lookup_commits(self, revisions):
+        if self.batch_check is None:
+            self.batch_check = self.start("--batch-check")
+        # newlines would split a request into two
+        requests = [revision for revision in revisions if "\n" not in revision]
+        self.batch_check.stdin.write("".join(revision + "^{commit}\n" for revision in requests).encode("utf-8"))
+        self.batch_check.stdin.flush()
+        for revision in requests:
+            fields = self.batch_check.stdout.readline().decode("utf-8").split()
+            # "<hash> commit <size>" or "<revision> missing"
+            self.commits[revision] = fields[0] if len(fields) == 3 and fields[1] == "commit" else None
+        for revision in revisions:
+            self.commits.setdefault(revision, None)
+
+    def rev_parse_many(self, revisions):
+        with self.lock:
+            missing = list(dict.fromkeys(revision for revision in revisions if revision not in self.commits))
+            if len(missing) > 0:
+                self.lookup_commits(missing)
+            return {revision: self.commits[revision] for revision in revisions}
+
+    def rev_parse(self, revision):
+        commit = self.rev_parse_many([revision])[revision]
+        if commit is None:
+            raise Exception("Unknown revision " + revision + " in " + self.repo_dir)
+        return commit
+
+    def exists_many(self, revisions):
+        return {revision: commit is not None for revision, commit in self.rev_parse_many(revisions).items()}
+
+    def exists(self, revision):
+        return self.exists_many([revision])[revision]
+
+    # Raw commit messages (without the header) of all commits in one round trip, None for unknown commits
+    def commit_messages(self, revisions):
+        with self.lock:
+            commits = self.rev_parse_many(revisions)
+            missing = list(dict.fromkeys(commit for commit in commits.values()
+                                         if commit is not None and commit not in self.messages))
+            if len(missing) > 0:
+                if self.batch is None:
+                    self.batch = self.start("--batch")
+                self.batch.stdin.write("".join(commit + "\n" for commit in missing).encode("utf-8"))
+                self.batch.stdin.flush()
+                for commit in missing:
+                    size = int(self.batch.stdout.readline().split()[2])
+                    content = self.batch.stdout.read(size + 1)[:-1].decode("utf-8", errors="replace")
+                    self.messages[commit] = content.split("\n\n", 1)[1] if "\n\n" in content else ""
+            return {revision: self.messages.get(commit) for revision, commit in commits.items()}
+
+    def commit_message(self, revision):
+        return self.commit_messages([revision])[revision]
+
+    # Which of the commits contain ancestor (a commit contains itself), with one git call for all of them
+    def contains_many(self, ancestor, revisions):
+        with self.lock:
+            ancestor = self.rev_parse(ancestor)
+            commits = self.rev_parse_many(revisions)
+            unknown = list(dict.fromkeys(commit for commit in commits.values() if commit is not None and
+                                         (ancestor, commit) not in self.ancestry))
+            if len(unknown) > 0:
+                # lists exactly the commits which descend from ancestor
+                output = self.run("rev-list", "--ancestry-path", "--stdin",
+                                  stdin="^" + ancestor + "\n" + "\n".join(unknown) + "\n").stdout
+                descendants = set(output.split())
+                for commit in unknown:
+                    self.ancestry[(ancestor, commit)] = commit == ancestor or commit in descendants
+            return {revision: commit is not None and self.ancestry[(ancestor, commit)]
+                    for revision, commit in commits.items()}
+
+    # a single check is cheaper with merge-base than listing all descendants
+    def is_ancestor(self, ancestor, revision):
+        with self.lock:
+            commits = self.rev_parse_many([ancestor, revision])
+            if commits[ancestor] is None or commits[revision] is None:
+                return False
+            key = (commits[ancestor], commits[revision])
+            if key not in self.ancestry:
+                self.ancestry[key] = self.run("merge-base", "--is-ancestor", *key, check=False).returncode == 0
+            return self.ancestry[key]
@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+
+# Index of the status files of a reproducer directory, stored in sqlite next to it (<reproducer_dir>.status.sqlite):
+#
+# 	bugs(id, mtime, size, similarity, crash_time, has_fix_commits, data), data is <id>/status.json
+# 	experiments(id, experiment, mtime, size, retest_state, status), status is <id>/<experiment>/status.json
+#
+# The JSON files stay the source of truth. sync() only stats them and parses the files which changed since they
+# were indexed, queries then read just the rows they select:
+#
+# 	index = StatusIndex(args.reproducer_dir)
+# 	index.sync("bictracker")
+# 	for bug_id, data, status in index.select("bictracker", states=["not_retested", "running"]): ...
+#
+# crash_time is the time of the syzkaller crash as syzbot shows it ("%Y/%m/%d %H:%M", which sorts like the dates).
+
+index_suffix = ".status.sqlite"
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.decoder.JSONDecodeError):
+        return None
+
+
+class StatusIndex:
+    def __init__(self, reproducer_dir, index_path=None):
+        self.reproducer_dir = reproducer_dir
+        if index_path is None:
+            index_path = os.path.abspath(reproducer_dir).rstrip("/") + index_suffix
+        self.index_path = index_path
+        # bictracker workers sync the same index, wait for their writes instead of failing
+        self.db = sqlite3.connect(index_path, timeout=300)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS bugs (id TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, similarity INTEGER,
+                                             crash_time TEXT, has_fix_commits INTEGER, data TEXT);
+            CREATE INDEX IF NOT EXISTS bugs_by_similarity ON bugs (similarity, crash_time);
+            CREATE INDEX IF NOT EXISTS bugs_by_crash_time ON bugs (crash_time);
+            CREATE TABLE IF NOT EXISTS experiments (id TEXT NOT NULL, experiment TEXT NOT NULL, mtime INTEGER,
+                                                    size INTEGER, retest_state TEXT, status TEXT,
+                                                    PRIMARY KEY (id, experiment));
+            CREATE INDEX IF NOT EXISTS experiments_by_state ON experiments (experiment, retest_state);
+        """)
+
+    def close(self):
+        self.db.close()
+
+    # Updates the rows of all bugs (and of their status of the experiments) whose files changed
+    def sync(self, *experiments):
+        bug_ids = [bug_id for bug_id in os.listdir(self.reproducer_dir)
+                   if os.path.isdir(os.path.join(self.reproducer_dir, bug_id))]
+        indexed = {row[0]: (row[1], row[2]) for row in self.db.execute("SELECT id, mtime, size FROM bugs")}
+        with self.db:
+            for bug_id in bug_ids:
+                path = os.path.join(self.reproducer_dir, bug_id, "status.json")
+                signature = file_signature(path)
+                if signature is None or indexed.get(bug_id) == signature:
+                    continue
+                data = load_json(path)
+                crash = (data or {}).get("syzkaller-crash", {})
+                self.db.execute("INSERT OR REPLACE INTO bugs (id, mtime, size, similarity, crash_time, has_fix_commits, "
+                                "data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (bug_id, signature[0], signature[1], (data or {}).get("similarity"), crash.get("time"),
+                                 int("fix-commits" in (data or {})), json.dumps(data) if data is not None else None))
+            removed = set(indexed) - set(bug_ids)
+            for bug_id in removed:
+                self.db.execute("DELETE FROM bugs WHERE id = ?", (bug_id,))
+                self.db.execute("DELETE FROM experiments WHERE id = ?", (bug_id,))
+
+            for experiment in experiments:
+                self.sync_experiment(experiment, bug_ids)
+
+    def sync_experiment(self, experiment, bug_ids):
+        indexed = {row[0]: (row[1], row[2]) for row in
+                   self.db.execute("SELECT id, mtime, size FROM experiments WHERE experiment = ?", (experiment,))}
+        for bug_id in bug_ids:
+            path = os.path.join(self.reproducer_dir, bug_id, experiment, "status.json")
+            signature = file_signature(path)
+            if signature is None:
+                if bug_id in indexed:
+                    self.db.execute("DELETE FROM experiments WHERE id = ? AND experiment = ?", (bug_id, experiment))
+                continue
+            if indexed.get(bug_id) == signature:
+                continue
+            # a status which could not be parsed replaces the old one as none, the bug counts as not retested until
+            # the file changes again
+            status = load_json(path)
+            self.db.execute("INSERT OR REPLACE INTO experiments (id, experiment, mtime, size, retest_state, status) "
+                            "VALUES (?, ?, ?, ?, ?, ?)", (bug_id, experiment, signature[0], signature[1],
+                                                          (status or {}).get("retest_state"),
+                                                          json.dumps(status) if status is not None else None))
+
+    # (id, data, status) of the bugs whose status of the experiment is in states, a bug without status counts as
+    # "not_retested". data is None if status.json of the bug could not be parsed.
+    def select(self, experiment, states=None, ids=None, min_similarity=None, crashed_after=None):
+        query = ("SELECT bugs.id, bugs.data, experiments.status FROM bugs LEFT JOIN experiments "
+                 "ON experiments.id = bugs.id AND experiments.experiment = ? WHERE 1")
+        parameters = [experiment]
+        if states is not None:
+            query += (" AND COALESCE(experiments.retest_state, 'not_retested') IN (" +
+                      ",".join("?" * len(states)) + ")")
+            parameters += list(states)
+        if ids is not None:
+            query += " AND bugs.id IN (" + ",".join("?" * len(ids)) + ")"
+            parameters += list(ids)
+        if min_similarity is not None:
+            query += " AND bugs.similarity >= ?"
+            parameters.append(min_similarity)
+        if crashed_after is not None:
+            query += " AND bugs.crash_time >= ?"
+            parameters.append(crashed_after)
+        for bug_id, data, status in self.db.execute(query, parameters):
+            yield (bug_id, json.loads(data) if data is not None else None,
+                   json.loads(status) if status is not None else {"retest_state": "not_retested"})
+
+    # (id, data) of all bugs ordered by similarity and crash time, newest first
+    def bugs(self, with_fix_commits=False):
+        query = "SELECT id, data FROM bugs"
+        if with_fix_commits:
+            query += " WHERE has_fix_commits"
+        # like the dashboard always did: a missing similarity counts as 0, a missing crash time as the oldest
+        query += " ORDER BY COALESCE(similarity, 0) DESC, crash_time DESC"
+        for bug_id, data in self.db.execute(query):
+            yield bug_id, json.loads(data) if data is not None else None
@@ -0,0 +1,89 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from autobisect import gitservice
+
+# Persistent index of the subject lines of all commits reachable from HEAD of a kernel repository, stored in sqlite
+# next to the object database like the commit index:
+#
+# 	subjects(hash, time, subject, normalized), indexed by subject and by normalized subject
+# 	tips(hash), the HEADs which were indexed
+#
+# update() only walks the commits which are not reachable from an indexed tip, so after a fetch it reads the new
+# commits instead of the whole history. Commits of a rewritten history (linux-next is rebuilt daily) stay in the
+# index, lookups therefore only return commits which are still reachable from HEAD, the newest one like
+# git log -1 --grep does.
+
+index_filename = "autobisect-subject-index.sqlite"
+
+
+# Lowercase with collapsed whitespace and without surrounding quotes and trailing dots, syzbot and mail clients
+# do not preserve the exact spelling of titles
+def normalize(subject):
+    subject = re.sub(r"\s+", " ", subject).strip().lower()
+    return subject.strip("\"'`").rstrip(".").strip()
+
+
+class SubjectIndex:
+    def __init__(self, repo_dir, index_path=None):
+        self.repo_dir = repo_dir
+        self.git = gitservice.get(repo_dir)
+        if index_path is None:
+            common_dir = self.git.run("rev-parse", "--git-common-dir").stdout.strip()
+            index_path = os.path.join(repo_dir, common_dir, index_filename)
+        self.index_path = index_path
+        # used by the threads of the crawler, serialized with the lock
+        self.db = sqlite3.connect(index_path, timeout=300, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS subjects (hash TEXT PRIMARY KEY, time INTEGER NOT NULL, subject TEXT NOT NULL,
+                                                 normalized TEXT NOT NULL) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS subjects_by_subject ON subjects (subject);
+            CREATE INDEX IF NOT EXISTS subjects_by_normalized ON subjects (normalized);
+            CREATE TABLE IF NOT EXISTS tips (hash TEXT PRIMARY KEY) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.db.close()
+
+    # Indexes the commits reachable from HEAD which are not reachable from an indexed tip
+    def update(self):
+        with self.lock:
+            self.update_locked()
+
+    def update_locked(self):
+        head = self.git.run("rev-parse", "HEAD").stdout.strip()
+        tips = [row[0] for row in self.db.execute("SELECT hash FROM tips")]
+        if head in tips:
+            return
+        # tips which were garbage collected cannot be excluded anymore
+        tips = [tip for tip, exists in self.git.exists_many(tips).items() if exists]
+        output = self.git.run("log", "--stdin", "--format=%H%x00%ct%x00%s",
+                              stdin="\n".join([head] + ["^" + tip for tip in tips]) + "\n").stdout
+        rows = []
+        for line in output.splitlines():
+            fields = line.split("\0")
+            if len(fields) == 3:
+                rows.append((fields[0], int(fields[1]), fields[2], normalize(fields[2])))
+        logging.info("Indexing subjects of " + str(len(rows)) + " commits")
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO subjects (hash, time, subject, normalized) VALUES (?, ?, ?, ?)",
+                                rows)
+            self.db.execute("INSERT OR IGNORE INTO tips (hash) VALUES (?)", (head,))
+
+    # Newest commit reachable from HEAD with exactly this subject, else with the same normalized subject, or None
+    def lookup(self, title):
+        with self.lock:
+            return self.lookup_locked(title)
+
+    def lookup_locked(self, title):
+        for column, value in [("subject", title.strip()), ("normalized", normalize(title))]:
+            rows = self.db.execute("SELECT hash FROM subjects WHERE " + column + " = ? ORDER BY time DESC", (value,))
+            for row in rows.fetchall():
+                if self.git.is_ancestor(row[0], "HEAD"):
+                    return row[0]
+        return None
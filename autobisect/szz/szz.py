@@ -4,6 +4,8 @@ import subprocess
 import dateparser
 import logging
 
+from autobisect.statusindex import StatusIndex
+
 pyszz_path = "../workspace/szz/pyszz"
 repos_path = "."
 
@@ -69,35 +71,55 @@ def run_szz(repro_path, reproducerid, fix_commit_hashes, earliest_crash_date=Non
     return result_json
 
 
+# Returns the inducing commits of szz_results.json, the ones most algorithms agree on first
+def load_inducing_commits(reproducer_directory):
+    results_path = os.path.join(reproducer_directory, "szz_results.json")
+    if not os.path.isfile(results_path):
+        return []
+    with open(results_path, "r") as szz_results_file:
+        try:
+            results = json.load(szz_results_file)
+        except json.decoder.JSONDecodeError:
+            logging.warning("Failed to parse " + results_path)
+            return []
+
+    votes = {}
+    for algorithm, result in results.items():
+        commits = result.get("inducing_commit_hash") if isinstance(result, dict) else None
+        # "no_output" and "no_inducing_commit" mark algorithms without a result
+        if not isinstance(commits, list):
+            continue
+        for commit in set(commits):
+            votes[commit] = votes.get(commit, 0) + 1
+    return sorted(votes, key=lambda commit: votes[commit], reverse=True)
+
+
 def start(args):
     repro_path = args.reproducer_dir
     logging.info("start")
     logging.info(repro_path)
     reproducers = []
     i = 0
-    dirs = os.listdir(repro_path)
-    total = len(dirs)
-    for directory in dirs:
-        with open(os.path.join(repro_path, directory, "status.json"), "r") as status_file:
-            status = json.load(status_file)
-        
+    # only bugs with fix commits are loaded from the status index
+    index = StatusIndex(repro_path)
+    index.sync()
+    bugs = [(directory, status) for directory, status in index.bugs(with_fix_commits=True) if status is not None]
+    index.close()
+    total = len(bugs)
+    for directory, status in bugs:
         force = True
         if not force and os.path.exists(os.path.join(repro_path, directory, "szz_results.json")):
             continue
 
-        if "fix-commits" in status:
-            logging.info(f"[{i}/{total}] Running SZZ for reproducer {directory}")
-            earliest_crash_date = None
-            for crash in status["crashes"]:
-                crash_time = dateparser.parse(crash["time"])
-                if earliest_crash_date is None or crash_time < earliest_crash_date:
-                    earliest_crash_date = crash_time
-            
-            earliest_crash_date = earliest_crash_date.strftime("%Y-%m-%dT%H:%M:%S")
-            result = run_szz(repro_path, directory, status["fix-commits"], earliest_crash_date)
-            with open(os.path.join(repro_path, directory, "szz_results.json"), "w") as szz_results_file:
-                json.dump(result, szz_results_file, indent=4)
-        else:
-            logging.info(f"[{i}/{total}] No fix-commit for {directory}, skipping")
-            continue
-        i += 1
\ No newline at end of file
+        logging.info(f"[{i}/{total}] Running SZZ for reproducer {directory}")
+        earliest_crash_date = None
+        for crash in status["crashes"]:
+            crash_time = dateparser.parse(crash["time"])
+            if earliest_crash_date is None or crash_time < earliest_crash_date:
+                earliest_crash_date = crash_time
+
+        earliest_crash_date = earliest_crash_date.strftime("%Y-%m-%dT%H:%M:%S")
+        result = run_szz(repro_path, directory, status["fix-commits"], earliest_crash_date)
+        with open(os.path.join(repro_path, directory, "szz_results.json"), "w") as szz_results_file:
+            json.dump(result, szz_results_file, indent=4)
+        i += 1
@@ -32,7 +32,7 @@ main() {
   # REPRODUCER=264b703d22effb171549375ad8aa17704033f1ae
   git -C $LINUX status
   python3 -m autobisect.autobisect bictrack --reproducer_dir $REPRODUCER_DIR --cache --linux $LINUX --retry_failed
-  # --retest_skipped --reproducer $REPRODUCER --retry_failed --force --retest_skipped
+  # --retest_skipped --reproducer $REPRODUCER --retry_failed --force --retest_skipped --jobs 8
 }
 
 main
\ No newline at end of file
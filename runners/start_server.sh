@@ -1,2 +1,2 @@
-cd /data/jakob.steeg-thesis/implementation/server
-FLASK_APP=server.py python3 -m flask run
\ No newline at end of file
+cd /data/jakob.steeg-thesis/implementation
+python3 -m server.server
\ No newline at end of file
@@ -1,11 +1,13 @@
 from flask import Flask, render_template
 import os
 import json
-import datetime
 
+from autobisect.statusindex import StatusIndex
+
+# run from the implementation directory like the other entry points: python3 -m server.server
 app = Flask(__name__)
 
-basepath = "../workspace"
+basepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workspace")
 
 
 @app.route('/')
@@ -18,49 +20,48 @@ def index():
             log = open(basepath + "/crawl.log", "r").read()
         return render_template('loading.html', log=log)
 
-    for directory in os.listdir(reproducer_dir):
+    # only status files which changed since the last request are parsed again, the index returns the bugs sorted
+    index = StatusIndex(reproducer_dir)
+    index.sync()
+    for directory, repro in index.bugs():
         try:
-            with open(reproducer_dir + f"/{directory}/status.json", "r") as f:
-                repro = json.load(f)
-                if repro["retest_state"] != "not_retested":
-                    try:
-                        with open(reproducer_dir + f"/{directory}/bisection/auto-bisect.log", "r") as f:
-                            repro["log"] = f.read()
-                            repro["log_info"] = extract_log_info(repro["log"])
-                            if repro["log_info"]["compilers"]:
-                                repro["compiler_text"] = " ".join(
-                                    [f"{compiler}(x{occurence})\n" for compiler, occurence in
-                                     repro["log_info"]["compilers"].items()])
-                    except Exception as e:
-                        repro["log"] = "Error occured while retrieving log: " + repr(e)
-                else:
-                    repro["log"] = ""
-                    repro["log_info"] = {}
-                    repro["compiler_text"] = ""
-
+            if repro is None:
+                raise Exception("status.json could not be parsed")
+            if repro["retest_state"] != "not_retested":
                 try:
-                    with open(reproducer_dir + f"/{directory}/bisection/syz-bisect.log", "r") as f:
-                        repro["syz_log_info"] = extract_log_info(f.read())
-                        repro["syz_compiler_text"] = " ".join([f"{compiler}(x{occurence})\n" for compiler, occurence in
-                                                               repro["syz_log_info"]["compilers"].items()])
+                    with open(reproducer_dir + f"/{directory}/bisection/auto-bisect.log", "r") as f:
+                        repro["log"] = f.read()
+                        repro["log_info"] = extract_log_info(repro["log"])
+                        if repro["log_info"]["compilers"]:
+                            repro["compiler_text"] = " ".join(
+                                [f"{compiler}(x{occurence})\n" for compiler, occurence in
+                                 repro["log_info"]["compilers"].items()])
                 except Exception as e:
-                    repro["syz_log_info"] = {}
-                    repro["syz_compiler_text"] = "Error occured while retrieving syz-log: " + repr(e)
+                    repro["log"] = "Error occured while retrieving log: " + repr(e)
+            else:
+                repro["log"] = ""
+                repro["log_info"] = {}
+                repro["compiler_text"] = ""
 
-                try:
-                    with open(reproducer_dir + f"/{directory}/szz_results.json", "r") as f:
-                        json_szz = json.load(f)
-                        repro["szz_results"] = json_szz
-                except Exception as e:
-                    repro["szz_results"] = []
-                reproducers.append(repro)
+            try:
+                with open(reproducer_dir + f"/{directory}/bisection/syz-bisect.log", "r") as f:
+                    repro["syz_log_info"] = extract_log_info(f.read())
+                    repro["syz_compiler_text"] = " ".join([f"{compiler}(x{occurence})\n" for compiler, occurence in
+                                                           repro["syz_log_info"]["compilers"].items()])
+            except Exception as e:
+                repro["syz_log_info"] = {}
+                repro["syz_compiler_text"] = "Error occured while retrieving syz-log: " + repr(e)
+
+            try:
+                with open(reproducer_dir + f"/{directory}/szz_results.json", "r") as f:
+                    json_szz = json.load(f)
+                    repro["szz_results"] = json_szz
+            except Exception as e:
+                repro["szz_results"] = []
+            reproducers.append(repro)
         except Exception as e:
             reproducers.append({"id": directory, "title": "Bug could not be loaded (Reason: " + repr(e)})
-
-    reproducers.sort(key=lambda x: (x["similarity"] if "similarity" in x else 0,
-                                    datetime.datetime.strptime(x["syzkaller-crash"]["time"],
-                                                               "%Y/%m/%d %H:%M") if "syzkaller-crash" in x else datetime.datetime(
-                                        1999, 10, 10)), reverse=True)
+    index.close()
 
     total = len(reproducers)
     # count how many with different similarities
@@ -115,3 +116,7 @@ def extract_log_info(log):
             info["estimated_steps_left"] = int(line.split(" ")[-2])
 
     return info
+
+
+if __name__ == "__main__":
+    app.run()